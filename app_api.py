@@ -1,10 +1,18 @@
 # app_api.py
 import os
+import time
+import asyncio
 import importlib
-from contextlib import asynccontextmanager
+from functools import lru_cache
+from contextlib import AsyncExitStack, asynccontextmanager
+import orjson
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
 # 🚩 第一步：在所有逻辑开始前加载环境变量（用于代理和 API Key）
 load_dotenv()
@@ -16,6 +24,14 @@ from src.sab_core.api.schemas import AgentRequest, AgentResponse
 # 全局状态存储容器
 state = {}
 
+# 模型列表的编码结果在所有客户端之间共享：过期前只查询、序列化一次
+MODELS_CACHE_TTL = 600.0
+_DEFAULT_MODELS_BODY = orjson.dumps({"models": ["gemini-2.0-flash", "gemini-1.5-pro"]})
+_models_lock = asyncio.Lock()
+
+# 同时进行的 Agent 运行数上限：满载时直接拒绝，而不是无限堆积任务
+_chat_slots = asyncio.Semaphore(settings.MAX_CONCURRENT_CHATS)
+
 # ============================================================
 # 🧬 生命周期管理 (Lifespan)
 # ============================================================
@@ -30,19 +46,28 @@ async def lifespan(app: FastAPI):
     
     try:
         # 1. 动态获取引擎实例 (根据 settings.ENGINE_TYPE)
+        # 组装过程包含 AiiDA profile 加载和首次感知，属于阻塞 I/O：放到线程里执行一次
         print(f"🧬 [Engine] Initializing '{settings.ENGINE_TYPE}' engine...")
-        state["engine"] = get_engine_instance()
+        state["engine"] = await asyncio.to_thread(get_engine_instance)
         
         # 2. 验证引擎是否就绪
         if state["engine"]:
             print(f"✅ [Engine] {settings.ENGINE_TYPE.upper()} is ready.")
+            # 启动时解析一次模型列表的提供者，/v1/models 不再逐次反射
+            state["models_provider"] = getattr(state["engine"]._brain, "get_available_models", None)
         
     except Exception as e:
         print(f"❌ [Backend] Startup failed: {e}")
         # 这里不 raise，让服务带病运行以便通过 API 报错，而不是直接崩溃
-    
-    yield
-    # 3. 清理工作
+
+    async with AsyncExitStack() as stack:
+        # 3. 启动引擎路由自带的后台任务（如共享的进程轮询器）
+        engine_lifespan = getattr(engine_api, "lifespan", None)
+        if engine_lifespan:
+            await stack.enter_async_context(engine_lifespan(app))
+        yield
+
+    # 4. 清理工作
     state.clear()
     print("🛑 [Backend] SABR-API shut down.")
 
@@ -78,22 +103,36 @@ def mount_engine_api():
         if hasattr(api_module, "router"):
             app.include_router(api_module.router, prefix="/v1")
             print(f"🔗 [Router] Mounted specific API for '{engine_name}'")
+        return api_module
     except ImportError:
         print(f"ℹ️ [Router] No extra API routes found for '{engine_name}'.")
     except Exception as e:
         print(f"⚠️ [Router] Failed to mount engine routes: {e}")
+    return None
 
-mount_engine_api()
+engine_api = mount_engine_api()
 
 # ============================================================
 # 🛣️ 通用公共端点 (Public Endpoints)
 # ============================================================
 
-@app.post("/v1/chat", response_model=AgentResponse)
-async def chat_endpoint(req: AgentRequest):
-    """
-    通用聊天接口。接收用户意图，返回 AI 回复和执行结果。
-    """
+# 请求体直接用 pydantic 解析原始字节，绕过 FastAPI 的参数注入；
+# 通过 openapi_extra 声明模型，OpenAPI 文档保持不变
+_CHAT_REQUEST_BODY = {"requestBody": {
+    "required": True,
+    "content": {"application/json": {"schema": AgentRequest.model_json_schema()}},
+}}
+
+
+async def _prepare_chat(request: Request):
+    """解析聊天请求，返回 (engine, intent)；引擎未就绪或满载时直接抛出 HTTP 错误"""
+    try:
+        req = AgentRequest.model_validate_json(await request.body())
+    except ValidationError as e:
+        # 走 FastAPI 自己的 422 处理（jsonable_encoder）；不回显原始输入：
+        # 非法 JSON 时 input 是原始 bytes，既无法编码也不该原样返回
+        raise RequestValidationError(e.errors(include_url=False, include_input=False))
+
     engine = state.get("engine")
     if not engine:
         raise HTTPException(status_code=503, detail="SABR Engine is not initialized.")
@@ -104,28 +143,159 @@ async def chat_endpoint(req: AgentRequest):
         # 如果是 AiiDA 引擎，自动注入档案背景
         intent = f"Context: Inspect archive '{req.context_archive}'. Task: {intent}"
 
+    if _chat_slots.locked():
+        raise HTTPException(status_code=429, detail="Too many concurrent agent runs, please retry shortly.")
+    return engine, intent
+
+
+def _dumps(payload) -> bytes:
+    """统一的 JSON 编码：orjson 直接产出 bytes；无法序列化的工具结果（如 AiiDA 对象）回退为 str"""
+    return orjson.dumps(payload, default=str)
+
+
+# 🚩 不设 response_model：处理函数自己序列化，避免 FastAPI 再做一遍校验
+@app.post("/v1/chat", responses={200: {"model": AgentResponse}}, openapi_extra=_CHAT_REQUEST_BODY)
+async def chat_endpoint(request: Request) -> Response:
+    """
+    通用聊天接口。接收用户意图，返回 AI 回复和执行结果。
+    """
+    engine, intent = await _prepare_chat(request)
+
     try:
-        # 执行 Agent 决策循环 (Run-Once 模式)
-        response_data = await engine.run_once(intent=intent)
+        # 执行 Agent 决策循环 (Run-Once 模式)，超时后取消，避免请求无限挂起
+        async with _chat_slots:
+            response_data = await asyncio.wait_for(engine.run_once(intent=intent), timeout=settings.AGENT_TIMEOUT)
         
-        # 将 EngineResponse 映射为符合 API Schema 的字典
-        return AgentResponse(
-            content=response_data.get("content", ""),
-            action_name=response_data.get("action_name", "unknown"),
-            result=response_data.get("result"),
-            suggestions=response_data.get("suggestions", [])
+        # EngineResponse 与 AgentResponse 字段一致：直接序列化，值为 None 的字段（如无结果的 say）不写入响应
+        return Response(
+            content=_dumps(response_data.model_dump(exclude_none=True)),
+            media_type="application/json"
         )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Agent did not finish within {settings.AGENT_TIMEOUT:.0f}s.")
     except Exception as e:
         print(f"🔥 [Chat Error] {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+
+def _sse_frame(event: dict) -> bytes:
+    return b"data: " + _dumps(event) + b"\n\n"
+
+
+@lru_cache(maxsize=64)
+def _status_frame(topic: str) -> bytes:
+    """status 事件的主题只有少数几种（"Perceiving context..."、"Thinking (Cycle n)..."）：按主题缓存编码结果"""
+    return _sse_frame({"type": "status", "topic": topic})
+
+
+def _done_frame(action) -> bytes:
+    """done 事件：Action 的 payload 可能带有工具返回的任意对象，由 orjson 编码并回退为 str"""
+    return _sse_frame({"type": "done", "action": action.model_dump()})
+
+
+# 长时间的模型调用/工具执行期间没有事件：定期发送 SSE 注释帧保活，代理不会因空闲断开连接
+SSE_KEEPALIVE_INTERVAL = 15.0
+_SSE_PING = b": ping\n\n"
+
+
+async def _with_keepalive(stream, interval: float = SSE_KEEPALIVE_INTERVAL, deadline: float = None):
+    """
+    逐条转发 `stream` 的事件；空闲超过 `interval` 秒时产出 None（由调用方写出保活帧）。
+    给定 `deadline`（loop.time() 时刻）时，到期即取消正在等待的事件并抛出 asyncio.TimeoutError。
+    """
+    loop = asyncio.get_running_loop()
+    stream = stream.__aiter__()
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(stream.__anext__())
+            timeout = interval
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                timeout = min(interval, remaining)
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                if deadline is None or loop.time() < deadline:
+                    yield None
+                continue
+            try:
+                event = pending.result()
+            except StopAsyncIteration:
+                return
+            pending = None
+            yield event
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+@app.post("/v1/chat/stream", openapi_extra=_CHAT_REQUEST_BODY)
+async def chat_stream_endpoint(request: Request) -> StreamingResponse:
+    """
+    流式聊天接口 (SSE)。逐条推送 engine.run_stream 的事件：
+    status（进度）、chunk（文本片段）、done（最终 Action）、error。
+    """
+    engine, intent = await _prepare_chat(request)
+
+    # 🚩 在返回响应之前就占用名额：并发超限的流式请求在这里得到 429，而不是排队等待
+    # （_prepare_chat 刚确认过有空位，此处的 acquire 不会挂起）
+    await _chat_slots.acquire()
+    released = False
+
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            _chat_slots.release()
+
+    async def events():
+        # 与 /v1/chat 相同的总时长上限（Python 3.10 没有 asyncio.timeout：用截止时刻实现）
+        deadline = asyncio.get_running_loop().time() + settings.AGENT_TIMEOUT
+        try:
+            try:
+                async for event in _with_keepalive(engine.run_stream(intent=intent), deadline=deadline):
+                    if event is None:
+                        # 保活只发十几个字节的注释帧，不重发任何数据
+                        yield _SSE_PING
+                        continue
+                    if event["type"] == "status":
+                        yield _status_frame(event["topic"])
+                        continue
+                    if event["type"] == "done":
+                        yield _done_frame(event["action"])
+                        continue
+                    yield _sse_frame(event)
+            except asyncio.TimeoutError:
+                # 保活帧让客户端的读超时永远不会触发：由服务端结束卡住的运行并释放名额
+                yield _sse_frame({"type": "error", "detail": f"Agent did not finish within {settings.AGENT_TIMEOUT:.0f}s."})
+            except Exception as e:
+                print(f"🔥 [Chat Stream Error] {e}")
+                yield _sse_frame({"type": "error", "detail": str(e)})
+        finally:
+            release()
+
+    # 生成器一次都没被迭代（客户端在响应开始前断开）时，由后台任务兜底释放名额
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"},
+                             background=BackgroundTask(release))
+
 @app.get("/v1/models")
-async def list_models():
+async def list_models() -> Response:
     """获取当前 Brain 支持的所有可用模型名称列表"""
-    engine = state.get("engine")
-    if engine and hasattr(engine._brain, 'get_available_models'):
-        return {"models": engine._brain.get_available_models()}
-    return {"models": ["gemini-2.0-flash", "gemini-1.5-pro"]}
+    models_provider = state.get("models_provider")
+    if not models_provider:
+        return Response(content=_DEFAULT_MODELS_BODY, media_type="application/json")
+
+    # 同一时刻只有一个请求去刷新，其余请求等待后直接复用同一份字节
+    async with _models_lock:
+        cached = state.get("models_body")
+        if cached is None or time.monotonic() - cached[0] > MODELS_CACHE_TTL:
+            # 模型列表来自远程 API 调用：放到线程里执行
+            models = await asyncio.to_thread(models_provider)
+            cached = state["models_body"] = (time.monotonic(), orjson.dumps({"models": models}))
+    return Response(content=cached[1], media_type="application/json")
 
 @app.get("/health")
 async def health_check():
@@ -142,4 +312,5 @@ async def health_check():
 if __name__ == "__main__":
     import uvicorn
     # 使用 8000 端口，生产环境建议 host 设为 0.0.0.0
-    uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
+    # 🚩 uvicorn[standard] 自带 uvloop/httptools；loop="auto" 在可用时即选用 uvloop（Windows 上回退到 asyncio）
+    uvicorn.run(app, host="127.0.0.1", port=8000, loop="auto")
\ No newline at end of file
@@ -1,29 +1,248 @@
 # engines/aiida/api.py
-from fastapi import APIRouter, HTTPException
+import asyncio
+import contextlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+import orjson
+from fastapi import APIRouter, HTTPException, Request, Response
+from loguru import logger
 from .tools import get_database_summary, get_recent_processes
+from .tools.base.cache import SingleFlight
 from aiida.orm import load_node
 
 router = APIRouter(prefix="/aiida", tags=["AiiDA"])
 
+# 共享轮询器的节奏与查询深度（请求的 limit 超过它时回退为直接查询）
+PROCESS_POLL_INTERVAL = 3.0
+PROCESS_POLL_LIMIT = 20
+# 快照连续无变化时轮询间隔逐次翻倍，直到该上限；一旦有变化立即恢复到 PROCESS_POLL_INTERVAL
+PROCESS_POLL_MAX_INTERVAL = 12.0
+# 长轮询 (`/processes?wait=...`) 单次最长挂起时间
+PROCESS_WAIT_MAX = 30.0
+
+# AiiDA 查询是同步阻塞的：统一放进一个有界线程池，既不阻塞事件循环，
+# 也把并发的数据库连接数限制在 DB_MAX_WORKERS 以内
+DB_MAX_WORKERS = 4
+_db_executor = ThreadPoolExecutor(max_workers=DB_MAX_WORKERS, thread_name_prefix="aiida-db")
+
+# 数据库不可用时的固定回复：导入时编码一次，故障期间不再重复序列化
+_PROCESSES_UNAVAILABLE_BODY = orjson.dumps({"detail": "Recent processes unavailable."})
+
+
+async def _run_db(func, *args, **kwargs):
+    """Run a blocking AiiDA call on the bounded DB pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, partial(func, *args, **kwargs))
+
+
+class ProcessBroadcast:
+    """
+    Single background poller shared by every `/processes` subscriber.
+
+    Each UI client polls the endpoint on its own timer; instead of one DB query
+    per client per tick, the poller refreshes one snapshot and every request
+    slices it, so query load no longer grows with the number of clients.
+    """
+    def __init__(self, interval: float = PROCESS_POLL_INTERVAL, limit: int = PROCESS_POLL_LIMIT,
+                 max_interval: float = PROCESS_POLL_MAX_INTERVAL):
+        self.interval = interval
+        self.max_interval = max_interval
+        self.limit = limit
+        self.latest = None
+        self.failed = False
+        self.task = None
+        # 快照内容变化时才递增；客户端通过 ETag 比较版本号，无变化时直接 304
+        # epoch 区分不同的进程生命周期，避免重启后版本号重复
+        self.revision = 0
+        self._epoch = int(time.time())
+        # 每个版本按 limit 缓存编码后的字节：同一版本只序列化一次，所有客户端共享
+        self._encoded = {}
+        # 版本变化时 set 并换新：长轮询的请求挂在上面，由变化唤醒而不是各自定时醒来
+        self._changed = asyncio.Event()
+
+    def _bump(self, rows):
+        self.latest = rows
+        self.revision += 1
+        self._encoded = {}
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_for_change(self, revision: int, timeout: float) -> bool:
+        """Wait until the snapshot revision moves past `revision`; False on timeout."""
+        if self.revision != revision:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def _poll(self):
+        delay = self.interval
+        while True:
+            revision = self.revision
+            try:
+                rows = await _run_db(get_recent_processes, limit=self.limit)
+                if rows != self.latest:
+                    self._bump(rows)
+                self.failed = False
+            except Exception as e:
+                # 查询失败时丢弃旧快照，并让请求直接拿到“不可用”回复
+                if self.latest is not None:
+                    self._bump(None)
+                self.failed = True
+                logger.debug("Process poll skipped: {}", e)
+            # 空闲退避：无变化（或持续失败）时拉长间隔，减少无意义的数据库查询
+            delay = self.interval if self.revision != revision else min(delay * 2, self.max_interval)
+            await asyncio.sleep(delay)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self.task
+        self.task = None
+        self.latest = None
+        self._encoded = {}
+        self.failed = False
+        # 关闭时唤醒仍在长轮询的请求
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def etag(self, limit: int) -> str:
+        return f'"{self._epoch}-{self.revision}-{limit}"'
+
+    def encoded(self, limit: int):
+        """Return the JSON-encoded rows for `limit`, or None if the cache cannot serve it."""
+        if self.latest is None or limit > self.limit:
+            return None
+        body = self._encoded.get(limit)
+        if body is None:
+            body = self._encoded[limit] = orjson.dumps(self.latest[:limit])
+        return body
+
+
+broadcast = ProcessBroadcast()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """由 app_api 的 lifespan 调用：启动/停止共享的进程轮询器"""
+    broadcast.start()
+    try:
+        yield
+    finally:
+        await broadcast.stop()
+
+
+def _encode(payload) -> bytes:
+    """
+    orjson 编码，跳过 FastAPI 的 jsonable_encoder。
+    datetime / UUID / numpy 数组由 orjson 原生处理；其余不认识的值（AiiDA 枚举、Path 等）回退为 str
+    """
+    return orjson.dumps(payload, default=str, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+# 正在执行的 (函数, 参数) → 编码任务：多个标签页同时发出的相同查询合并为一次数据库往返
+_inflight = SingleFlight()
+
+
+async def _run_db_json(func, *args, **kwargs) -> Response:
+    """
+    Run a blocking AiiDA call and JSON-encode its result on the DB pool.
+
+    Large payloads (e.g. node attributes holding arrays) are encoded on the
+    worker thread too, so neither the query nor the serialisation blocks the
+    event loop. Identical calls that arrive while one is running share it.
+    """
+    key = (func, args, tuple(sorted(kwargs.items())))
+    body = await _inflight.run(key, lambda: _run_db(lambda: _encode(func(*args, **kwargs))))
+    return Response(content=body, media_type="application/json")
+
+
+def _processes_unavailable() -> Response:
+    return Response(content=_PROCESSES_UNAVAILABLE_BODY, status_code=503, media_type="application/json")
+
+
+async def _client_disconnected(request: Request):
+    """挂起直到客户端断开（ASGI 的 http.disconnect 消息）"""
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _wait_for_change_or_disconnect(request: Request, revision: int, timeout: float) -> bool:
+    """
+    Long-poll wait that also ends when the client goes away.
+
+    Change, timeout and disconnect are raced in one `asyncio.wait`, so an
+    abandoned long-poll is released immediately instead of holding its
+    coroutine for the full timeout. True only if the snapshot changed.
+    """
+    change = asyncio.ensure_future(broadcast.wait_for_change(revision, timeout))
+    gone = asyncio.ensure_future(_client_disconnected(request))
+    try:
+        await asyncio.wait({change, gone}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        gone.cancel()
+        change.cancel()
+    return change.done() and not change.cancelled() and change.result()
+
+
+def _node_details(pk: int) -> dict:
+    node = load_node(pk)
+    # 返回精简后的节点信息，用于 UI 渲染
+    return {
+        "pk": node.pk,
+        "uuid": node.uuid,
+        "label": node.label,
+        "type": node.node_type,
+        "attributes": node.base.attributes.all,
+        # datetime 交给 orjson 直接编码为 ISO 8601，不再逐个 str()
+        "ctime": node.ctime,
+        "mtime": node.mtime
+    }
+
+
 @router.get("/summary")
 async def api_get_summary():
-    return get_database_summary()
+    return await _run_db_json(get_database_summary)
 
 @router.get("/processes")
-async def api_get_processes(limit: int = 5):
-    return get_recent_processes(limit=limit)
+async def api_get_processes(request: Request, limit: int = 5, wait: float = 0.0):
+    """
+    Recent processes from the shared snapshot.
+
+    With `If-None-Match` set to the current ETag and `wait > 0`, the request is
+    held (long-poll) until the snapshot changes or `wait` seconds pass.
+    """
+    body = broadcast.encoded(limit)
+    if body is not None:
+        etag = broadcast.etag(limit)
+        if request.headers.get("if-none-match") == etag:
+            if wait > 0 and await _wait_for_change_or_disconnect(request, broadcast.revision, min(wait, PROCESS_WAIT_MAX)):
+                # 快照已变化：重新走一遍，返回新版本（或不可用回复）
+                return await api_get_processes(request, limit)
+            # 客户端手里已是最新版本：不再重发快照
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
+    if broadcast.failed:
+        # 轮询器刚失败过：不再为每个客户端重复打一次已知会失败的查询
+        return _processes_unavailable()
+    try:
+        return await _run_db_json(get_recent_processes, limit=limit)
+    except Exception:
+        return _processes_unavailable()
 
 @router.get("/nodes/{pk}")
 async def api_get_node(pk: int):
     try:
-        node = load_node(pk)
-        # 返回精简后的节点信息，用于 UI 渲染
-        return {
-            "pk": node.pk,
-            "label": node.label,
-            "type": node.node_type,
-            "attributes": node.base.attributes.all,
-            "ctime": str(node.ctime)
-        }
+        return await _run_db_json(_node_details, pk)
     except Exception as e:
-        raise HTTPException(status_code=404, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=404, detail=str(e))
@@ -45,9 +45,11 @@ Current Resources:
 {schema_info}
 """
 
+# 🚩 工具列表只依赖 tools.__all__：导入时解析一次，之后每次创建 Brain 直接复用
+TOOL_LIST = [getattr(tools, name) for name in tools.__all__]
+
 def create_aiida_brain(schema_info: str):
-    tool_list = [getattr(tools, name) for name in tools.__all__]
     return GeminiBrain(
         system_prompt=EVOLUTION_PROMPT.format(schema_info=schema_info),
-        tools=tool_list
+        tools=TOOL_LIST
         )
\ No newline at end of file
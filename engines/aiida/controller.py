@@ -1,12 +1,78 @@
+import asyncio
 import os
-import tkinter as tk
-from tkinter import filedialog
+import re
+import time
+from functools import lru_cache, partial
+from aiida.orm import load_node
 from nicegui import ui, run
 from engines.aiida.tools import get_database_summary, get_recent_processes
+from engines.aiida.tools.base.cache import SingleFlight
+from engines.aiida.ui.chat import (
+    DETAIL_LOG_MAX_LINES, STREAM_PAINT_INTERVAL, STREAM_SCROLL_INTERVAL,
+    clear_chat_area, hide_insight, render_chat_bubble, render_suggestion_chips, scroll_to_bottom, settle_stream,
+    terminal_timestamp,
+)
+from engines.aiida.ui.dialogs import ask_for_archive_path
 from sab_core.protocols.controller import BaseController
 from sab_core.memory.json_memory import JSONMemory
 from src.sab_core.config import settings
 
+# 终端日志级别对应的图标（ANSI 风格或简单的 Emoji）
+_TERMINAL_ICONS = {
+    "INFO": "🔹",
+    "DEBUG": "🔍",
+    "SUCCESS": "✅",
+    "ERROR": "❌",
+    "WARNING": "⚠️"
+}
+
+
+@lru_cache(maxsize=64)
+def _basename(path: str) -> str:
+    """档案路径在一个会话里反复出现（历史列表、意图、欢迎屏）：文件名只拆分一次"""
+    return os.path.basename(path)
+
+
+@lru_cache(maxsize=64)
+def _archive_namespace(path: str) -> str:
+    """档案对应的记忆命名空间，例如 /x/demo.aiida → demo_aiida"""
+    return _basename(path).replace('.', '_')
+
+
+# 结论性标记（开头的 ## 标题、Conclusion:、Summary:）合并为一个预编译的交替模式，一次扫描完成
+# 表格仍用两次子串查找：`\|.*---` 在大量 "|" 而没有 "---" 的消息上会反复回溯
+_CONCLUSIVE_MARKERS = re.compile(r'\A\s*##|Conclusion:|Summary:')
+
+# 每个浏览器标签页都有自己的控制器和 10s ticker：最近进程按 (档案, limit) 短暂缓存，
+# 同一时间窗口内的多个标签页共用一次数据库查询
+PROCESS_CACHE_TTL = 5.0
+_process_cache = {}
+# 正在进行中的查询：缓存失效瞬间同时到达的 ticker 等待同一个任务，而不是各查一次
+_process_inflight = SingleFlight()
+
+
+async def _cached_recent_processes(archive: str, limit: int = 5):
+    """TTL 内直接返回缓存的进程列表，否则在线程池里查询一次（并发请求共用）并写回缓存"""
+    key = (archive, limit)
+    hit = _process_cache.get(key)
+    if hit is not None and time.monotonic() - hit[0] < PROCESS_CACHE_TTL:
+        return hit[1]
+
+    rows = await _process_inflight.run(key, lambda: run.io_bound(get_recent_processes, limit=limit))
+    _process_cache[key] = (time.monotonic(), rows)
+    return rows
+
+# 进程 ticker 的自适应节奏：查询变慢（超过 PROCESS_TICK_SLOW 秒）时间隔翻倍直到上限，
+# 恢复正常后逐步减半回到基础间隔；NiceGUI 的 timer 会等回调结束后再计时，不会重叠
+PROCESS_TICK_INTERVAL = 10.0
+PROCESS_TICK_MAX_INTERVAL = 60.0
+PROCESS_TICK_SLOW = 3.0
+
+
+def _archive_refresh_intent(path: str) -> str:
+    return f"Inspect archive '{path}'. User task: System Refresh"
+
+
 class AiiDAController(BaseController):
     """
     AiiDA 引擎专用控制器
@@ -15,8 +81,20 @@ class AiiDAController(BaseController):
     def __init__(self, engine, components, memory):
         super().__init__(engine, components)
         self.global_mem = memory
+        # 侧边栏中已渲染的档案条目：路径 → ui.item
+        self._history_items = {}
+        # 已加载的档案记忆：(存储目录, 档案名) → JSONMemory
+        self._memory_cache = {}
+        # 正在加载的节点 PK（去重连续点击）
+        self._inspecting = set()
+        # Insight 区闪烁动画的当前相位（见 style.css 的 data-flash）
+        self._flash = False
+        # _build_intent 的上下文前缀：(档案路径, 前缀)
+        self._intent_prefix = (None, '')
+        # 上一次分发给 Reporter 的进程列表
+        self._last_processes = None
         self._load_archive_history()
-        self.ticker_timer = ui.timer(10.0, self.update_process_status)
+        self.ticker_timer = ui.timer(PROCESS_TICK_INTERVAL, self.update_process_status)
         self.terminal = components.get('thought_log')
         self.insight = components.get('insight_view')
 
@@ -26,9 +104,7 @@ class AiiDAController(BaseController):
 
     def _prepare_ui(self):
         """Reset UI states and clear inputs before a new request."""
-        if 'insight_view' in self.components:
-            self.components['insight_view'].set_content('')
-            self.components['insight_view'].style('display: none;')
+        hide_insight(self.components.get('insight_view'))
         
         self.components['welcome_screen'].set_visibility(False)
         self.components['suggestion_container'].set_visibility(False)
@@ -36,24 +112,8 @@ class AiiDAController(BaseController):
 
     def _create_chat_bubble(self, text: str, role: str = 'user'):
         """Render custom chat bubbles for users or AI with specific styling."""
-        with self.components['chat_area']:
-            if role == 'user':
-                # User Bubble: Aligned Right, Primary theme
-                with ui.row().classes('w-full justify-end mb-6'):
-                    with ui.column().classes('items-end max-w-[80%]'):
-                        ui.label('YOU').classes('text-[10px] font-black opacity-30 pr-2 tracking-tighter')
-                        with ui.card().classes('bg-primary/10 p-4 rounded-2xl shadow-none border-none').style('border-bottom-right-radius: 2px;'):
-                            ui.markdown(text).classes('text-slate-200 leading-relaxed')
-            else:
-                # AI Bubble: Aligned Left, with Avatar and Secondary theme
-                with ui.row().classes('w-full justify-start mb-6'):
-                    with ui.row().classes('items-start gap-3 no-wrap'):
-                        ui.avatar('auto_awesome', color='primary', text_color='white').props('size=sm shadow-lg')
-                        with ui.column().classes('max-w-[85%] items-start'):
-                            ui.label('SABR-AIIDA').classes('text-[10px] font-black text-primary opacity-60 pl-1 tracking-tighter')
-                            with ui.card().classes('bg-white/5 border border-white/10 p-4 rounded-2xl shadow-none').style('border-top-left-radius: 2px;'):
-                                ui.markdown(text).classes('text-slate-300 leading-relaxed')
-    
+        render_chat_bubble(self.components['chat_area'], text, role)
+
     def _route_engine_result(self, response):
         """Route engine output to the appropriate UI component (Chat vs. Insight View)."""
         if not response:
@@ -82,7 +142,8 @@ class AiiDAController(BaseController):
     async def handle_send(self, preset_text=None):
         """Main entry point for handling user messages and orchestrating UI updates."""
         text = preset_text if preset_text else self.components['input'].value
-        if not text: return
+        # 🚩 防抖：重复点击不会再启动一轮完整的 Agent 运行
+        if not text or self._is_duplicate_submit(text): return
 
         # 1. UI Preparation
         self._prepare_ui()
@@ -99,17 +160,18 @@ class AiiDAController(BaseController):
                     thought_topic = ui.label('SABR is starting...').classes('text-xs italic ml-2')
                 
                 # Detailed logs inside the expansion
-                detail_log = ui.log().classes('w-full h-32 text-[10px] bg-slate-900/50 p-2')
+                detail_log = ui.log(max_lines=DETAIL_LOG_MAX_LINES).classes('w-full h-32 text-[10px] bg-slate-900/50 p-2')
 
             # 2. 🚩 AI Response Bubble (Initially empty)
             with ui.row().classes('w-full justify-start mb-6'):
                 with ui.row().classes('items-start gap-3 no-wrap'):
                     ui.avatar('auto_awesome', color='primary').props('size=sm')
                     with ui.card().classes('bg-white/5 border border-white/10 p-4 rounded-2xl'):
-                        ai_markdown = ui.markdown('').classes('text-slate-300')
-
-        ui.run_javascript('window.scrollTo(0, document.body.scrollHeight)')
+                        # 🚩 流式阶段只更新纯文本，结束时再解析一次 Markdown
+                        ai_stream = ui.label('').classes('whitespace-pre-wrap text-slate-300')
         
+        # 流式片段先缓存，按 STREAM_PAINT_INTERVAL 节流后整体写入（并随之滚动一次）
+        chunks, last_paint, last_scroll = [], 0.0, 0.0
         try:
             # Consume the engine stream
             async for event in self.engine.run_stream(intent=text):
@@ -122,8 +184,14 @@ class AiiDAController(BaseController):
                     # Streaming tokens into the markdown component
                     # Note: You need a small logic to extract "content" from the JSON stream
                     # Here we simplify: assume chunk is part of the final text
-                    ai_markdown.content += event['text']
-                    ui.run_javascript('window.scrollTo(0, document.body.scrollHeight)')
+                    chunks.append(event['text'])
+                    now = time.monotonic()
+                    if now - last_paint >= STREAM_PAINT_INTERVAL:
+                        ai_stream.set_text(''.join(chunks))
+                        last_paint = now
+                        if now - last_scroll >= STREAM_SCROLL_INTERVAL:
+                            scroll_to_bottom()
+                            last_scroll = now
 
                 elif event['type'] == 'done':
                     # Auto-collapse thinking if successful
@@ -134,59 +202,53 @@ class AiiDAController(BaseController):
             detail_log.push(f"❌ Error: {str(e)}")
             thought_topic.set_text("Thinking interrupted by error.")
         finally:
-            thinking.delete()
-            ui.run_javascript('window.scrollTo(0, document.body.scrollHeight)')
+            # 节流窗口内最后到达的片段（包括出错前的）在这里补写，并换成最终的 Markdown
+            if chunks:
+                settle_stream(ai_stream, ''.join(chunks))
+            scroll_to_bottom()
 
     def _build_intent(self, text: str) -> str:
         """Helper to inject archive context into the user intent."""
         path = self.components['archive_select'].value
-        if path and path != '(None)':
-            return f"Context: Inspect archive '{path}'. Task on {os.path.basename(path)}: {text}"
-        return text
+        if not path or path == '(None)':
+            return text
+        # 档案很少切换：前缀按当前路径缓存，路径变化时自动重建
+        if self._intent_prefix[0] != path:
+            self._intent_prefix = (path, f"Context: Inspect archive '{path}'. Task on {_basename(path)}: ")
+        return self._intent_prefix[1] + text
 
     def render_suggestion_chips(self, suggestions):
         """Render clickable suggestion chips in the chat area."""
-        with self.components['chat_area']:
-            with ui.row().classes('flex-wrap gap-2 py-2 pl-12 mb-8 animate-fade-in'):
-                for text in suggestions:
-                    ui.button(
-                        text, 
-                        on_click=lambda t=text: self.handle_send(preset_text=t)
-                    ).props('outline rounded dense no-caps shadow-none').classes(
-                        'text-[11px] px-3 py-1 border-primary/20 text-primary/70 '
-                        'hover:bg-primary/10 hover:border-primary transition-all bg-white/5 italic'
-                    )
+        render_suggestion_chips(self.components['chat_area'], suggestions, self.handle_send)
 
     def _load_archive_history(self):
         """从全局记忆中读取历史路径并填充 UI"""
         history = self.global_mem.get_raw_data("recent_archives") or []
         if not history: return
 
-        # 更新下拉框选项
-        self.components['archive_select'].options = history
+        # 更新下拉框选项（未变化时跳过，避免一次无意义的客户端更新）
+        if self.components['archive_select'].options != history:
+            self.components['archive_select'].options = history
         
-        # 更新左侧边栏的 UI 列表
-        with self.components['archive_history']:
-            for path in history:
-                filename = os.path.basename(path)
-                with ui.item(on_click=lambda p=path: self.components['archive_select'].set_value(p)) \
-                    .classes('rounded-xl hover:bg-blue-50 px-8 py-1 cursor-pointer'):
-                    with ui.item_section():
-                        ui.label(filename).classes('text-xs')
-
-    def _add_to_history_ui(self, path: str):
+        # 更新左侧边栏的 UI 列表：与新增条目走同一个渲染函数，已渲染的路径直接跳过
+        # 启动时加载的条目点击后只改下拉框的值（由 select_archive 完成一次刷新）
+        select = self.components['archive_select']
+        for path in history:
+            self._add_to_history_ui(path, on_click=partial(select.set_value, path))
+
+    def _add_to_history_ui(self, path: str, on_click=None):
         """
         🚩 核心修复：将新选择的路径动态渲染到左侧边栏的 ui.list 中
+        on_click 缺省时点击调用 handle_archive_selection
         """
-        import os
-        from nicegui import ui
-        
-        filename = os.path.basename(path)
+        # 已经在侧边栏里的路径不再重复创建条目
+        if path in self._history_items: return
+        filename = _basename(path)
         
         # 使用 context manager 指向 web.py 中定义的 list 容器
         with self.components['archive_history']:
             # 🚩 优化：点击时调用专有的 handle_archive_selection
-            item = ui.item(on_click=lambda: self.handle_archive_selection(path)) \
+            item = ui.item(on_click=on_click or partial(self.handle_archive_selection, path)) \
                 .classes('px-8 py-2 rounded-xl cursor-pointer transition-all duration-300 '
                         'group hover:bg-white/5 hover:pl-10') # 增加一个向右滑动的动效
                 
@@ -204,11 +266,11 @@ class AiiDAController(BaseController):
                         'text-[11px] font-medium text-slate-400 transition-colors '
                         'group-hover:text-white'
                     )
+        self._history_items[path] = item
 
     async def handle_archive_selection(self, path: str):
         """当用户点击侧边栏档案时的核心处理逻辑"""
-        import os
-        filename = os.path.basename(path)
+        filename = _basename(path)
         
         # 1. 更新内部状态（这会解除 Ticker 的守卫）
         self.components['archive_select'].set_value(path)
@@ -233,10 +295,15 @@ class AiiDAController(BaseController):
         if not current_archive or current_archive == "(None)":
             return 
 
+        started = time.monotonic()
         try:
-            
-            # 使用 io_bound 避免 AiiDA 查询导致 UI 抽搐
-            processes = await run.io_bound(get_recent_processes, limit=5)
+            # 使用 io_bound 避免 AiiDA 查询导致 UI 抽搐；多个标签页在 TTL 内共享同一次查询
+            processes = await _cached_recent_processes(current_archive, limit=5)
+            self._adapt_ticker(slow=time.monotonic() - started > PROCESS_TICK_SLOW)
+
+            # 进程列表与上一次相同（TTL 内的缓存命中或数据库无变化）时不再重绘
+            if processes == self._last_processes: return
+            self._last_processes = processes
             
             # 分发给 Reporter 渲染
             for reporter in self.engine._reporters:
@@ -246,6 +313,17 @@ class AiiDAController(BaseController):
         except Exception as e:
             # 这里记录到 Thought Log，方便调试但不弹窗干扰用户
             self.engine.log(f"Ticker update skipped: {str(e)}", level="DEBUG")
+            self._adapt_ticker(slow=True)
+
+    def _adapt_ticker(self, slow: bool):
+        """数据库慢或出错时拉长 ticker 间隔，恢复后逐步回到基础间隔"""
+        interval = self.ticker_timer.interval
+        if slow:
+            interval = min(interval * 2, PROCESS_TICK_MAX_INTERVAL)
+        else:
+            interval = max(interval / 2, PROCESS_TICK_INTERVAL)
+        if interval != self.ticker_timer.interval:
+            self.ticker_timer.interval = interval
 
     def log(self, message: str, level: str = "INFO"):
         """智能日志路由：决定信息去往终端还是见解区"""
@@ -259,32 +337,19 @@ class AiiDAController(BaseController):
 
     def _is_conclusive_content(self, message: str) -> bool:
         """识别内容是否为“结论性/结构化”数据"""
-        # 检查是否包含表格、二级以上标题、或明确的结论标记
-        has_table = "|" in message and "---" in message
-        has_header = message.strip().startswith("##") or message.strip().startswith("###")
-        is_summary = "Conclusion:" in message or "Summary:" in message
-        return has_table or has_header or is_summary
+        # 检查是否包含二级以上标题、明确的结论标记或表格
+        return _CONCLUSIVE_MARKERS.search(message) is not None \
+            or ("|" in message and "---" in message)
 
     def _render_terminal(self, message: str, level: str):
         """格式化并推送到黑色终端"""
         if not self.terminal: return
         
-        # 定义不同级别的颜色（ANSI 风格或简单的 Emoji）
-        icons = {
-            "INFO": "🔹",
-            "DEBUG": "🔍",
-            "SUCCESS": "✅",
-            "ERROR": "❌",
-            "WARNING": "⚠️"
-        }
-        icon = icons.get(level.upper(), "•")
+        # 级别在各调用处已是大写，直接查表
+        icon = _TERMINAL_ICONS.get(level, "•")
         
         # 格式化消息：[10:30:05] ✅ Query completed.
-        import datetime
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        formatted_msg = f"[{timestamp}] {icon} {message}"
-        
-        self.terminal.push(formatted_msg)
+        self.terminal.push(f"[{terminal_timestamp()}] {icon} {message}")
 
     def _render_insight(self, message: str):
         """将结构化数据渲染到见解区并使其可见"""
@@ -304,29 +369,56 @@ class AiiDAController(BaseController):
         if not path or path == '(None)': return
         
         # 1. 调用基类方法或直接操作组件
-        self.components['chat_area'].clear()
+        clear_chat_area(self.components['chat_area'])
         
         # 2. 执行 AiiDA 特有逻辑
         stats = await run.io_bound(get_database_summary)
         if stats['status'] == 'success':
-            self.update_ui_component('welcome_title', f"Loaded {os.path.basename(path)}")
+            self.update_ui_component('welcome_title', f"Loaded {_basename(path)}")
             msg = f"Database ready: {stats['node_count']} nodes"
             self.update_ui_component('welcome_sub', msg)
         
         # 3. 通知引擎同步
-        await self.engine.run_once(intent=f"Inspect archive '{path}'. User task: System Refresh")
+        await self._refresh_archive(path)
         
+    async def _refresh_archive(self, path: str):
+        """
+        通知引擎同步档案（这次运行会切换 AiiDA 后端）。
+        每次选择都重新运行：快速 A → B → A 时合并两次 A 会让后端停留在 B
+        """
+        intent = _archive_refresh_intent(path)
+        try:
+            return await self.engine.run_once(intent=intent)
+        finally:
+            # 后端已切换：切换期间查到的进程列表可能属于上一个档案，丢弃后由下一次 tick 重新查询
+            _process_cache.clear()
+
+    async def _archive_memory(self, archive_name: str) -> JSONMemory:
+        """每个档案的记忆只从磁盘加载一次，之后重新选择该档案直接复用同一实例"""
+        key = (settings.MEMORY_DIR, archive_name)
+        memory = self._memory_cache.get(key)
+        if memory is None:
+            # 历史文件可能很大：在线程池里读盘解析，不阻塞事件循环
+            memory = await run.io_bound(JSONMemory, storage_dir=settings.MEMORY_DIR, namespace=archive_name)
+            memory = self._memory_cache.setdefault(key, memory)
+        return memory
+
     async def select_archive(self, path):
         """环境重置联动：切换档案并更新欢迎屏"""
         if not path or path == '(None)': return
         self.components['archive_select'].value = path
-        filename = os.path.basename(path)
+        filename = _basename(path)
 
-        self.components['chat_area'].clear()
+        clear_chat_area(self.components['chat_area'])
         self.components['welcome_screen'].set_visibility(True)
         self.components['suggestion_container'].set_visibility(True)
 
-        stats = await run.io_bound(get_database_summary)
+        # 🚩 档案摘要与该档案的记忆文件互不依赖：并发读取，等待时间取两者的最大值而非之和
+        archive_name = _archive_namespace(path)
+        stats, new_memory = await asyncio.gather(
+            run.io_bound(get_database_summary),
+            self._archive_memory(archive_name),
+        )
         if stats['status'] == 'success':
             self.components['welcome_title'].set_text(f"Loaded {filename}")
             self.components['welcome_title'].classes(replace='text-5xl font-light tracking-tight text-center text-primary opacity-100')
@@ -338,34 +430,25 @@ class AiiDAController(BaseController):
             self.components['welcome_sub'].set_text(sub_text)
             ui.notify(f"Environment reset to {filename}", type='positive')
         
-        # 🚩 档案感知记忆切换
-        archive_name = os.path.basename(path).replace('.', '_')
-        new_memory = JSONMemory(storage_dir=settings.MEMORY_DIR, namespace=archive_name)
-        
-        # 动态更换引擎的记忆模块
+        # 🚩 档案感知记忆切换：动态更换引擎的记忆模块
         self.engine._memory = new_memory
         
         
-        await self.engine.run_once(intent=f"Inspect archive '{path}'. User task: System Refresh")
+        await self._refresh_archive(path)
 
     async def pick_local_file(self):
         """处理本地文件选择"""
-        def get_path():
-            root = tk.Tk(); root.withdraw(); root.attributes('-topmost', True)
-            p = filedialog.askopenfilename(filetypes=[("AiiDA Archives", "*.aiida *.zip")])
-            root.destroy()
-            return p
-
-        selected_path = await run.io_bound(get_path)
+        # 对话框由专用 Tk 线程弹出，事件循环在用户选择期间保持响应
+        selected_path = await ask_for_archive_path()
         if selected_path:
-            # 1. 获取当前历史
-            history = self.global_mem.get_raw_data("recent_archives") or []
+            # 1. 获取当前历史：dict 保持顺序并去重，成员判断为 O(1)
+            recent = dict.fromkeys(self.global_mem.get_raw_data("recent_archives") or [])
 
             # 2. 如果是新路径，则存入
-            if selected_path not in history:
-                history.append(selected_path)
+            if selected_path not in recent:
+                recent[selected_path] = None
                 # 只保留最近 10 条
-                self.global_mem.set_kv("recent_archives", history[-10:])
+                self.global_mem.set_kv("recent_archives", list(recent)[-10:])
                 
                 # 3. 动态更新 UI (这里复用之前的 UI 添加代码)
                 self._add_to_history_ui(selected_path)
@@ -395,18 +478,21 @@ class AiiDAController(BaseController):
         
     async def handle_node_inspection(self, msg):
         """处理 ID 锚点点击"""
-        from aiida.orm import load_node
-        import json
         node_pk = msg.args.get('id')
-        if not node_pk: return
+        # 🚩 同一节点的加载尚未完成时，连续点击直接忽略，不再重复排队查询
+        if not node_pk or node_pk in self._inspecting: return
 
         self.components['thought_log'].push(f"🔍 Fetching Node: {node_pk}...")
+        self._inspecting.add(node_pk)
         try:
             node = await run.io_bound(load_node, int(node_pk))
             details = f"📄 *Node Detail:* {node_pk}\n---\n..." # 此处省略拼接逻辑
             self.components['debug_log'].set_content(details)
-            self.components['debug_log'].classes(remove='insight-highlight')
-            ui.timer(0.1, lambda: self.components['debug_log'].classes('insight-highlight'), once=True)
+            # 🚩 纯 CSS 闪烁：切换 data-flash 即重新播放动画，一次属性更新即可
+            self._flash = not self._flash
+            self.components['debug_log'].props(f'data-flash={int(self._flash)}')
         except Exception as e:
             self.components['thought_log'].push(f"❌ Error: {str(e)}")
+        finally:
+            self._inspecting.discard(node_pk)
 
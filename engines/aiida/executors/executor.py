@@ -8,10 +8,21 @@ import inspect
 # 批量导入你的工具库
 from engines.aiida import tools
 
+# Brain/Engine 附加的元字段：不应传给接受 **kwargs 的工具
+_META_KEYS = frozenset({'content', 'suggestions'})
+
 class AiiDAExecutor:
     def __init__(self):
         # 建立一个完整的工具清单
         self.tool_map =  {name: getattr(tools, name) for name in tools.__all__}
+        # 🚩 签名内省只做一次：每个工具记录 (函数, 是否接受 **kwargs, 参数名集合)，执行时一次查表全部取到
+        self._tool_meta = {name: (func, *self._inspect(func)) for name, func in self.tool_map.items()}
+
+    @staticmethod
+    def _inspect(tool_func):
+        parameters = inspect.signature(tool_func).parameters
+        accepts_kwargs = any(p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters.values())
+        return accepts_kwargs, frozenset(parameters)
 
     async def execute(self, action: Action) -> Any:
         """
@@ -25,29 +36,28 @@ class AiiDAExecutor:
         # 2. Handle specific error reports from the Brain
         if action.name == "error_reported":
             error_msg = action.payload.get('message', 'Unknown brain error')
-            logger.error(f"🧠 Brain Report Error: {error_msg}")
+            logger.error("🧠 Brain Report Error: {}", error_msg)
             return f"System Error: {error_msg}" # 返回给 Reporter 展示
         
         # 3. Retrieve the target tool function
-        tool_func = self.tool_map.get(action.name)
-        if not tool_func:
-            logger.warning(f"⚠️ Action '{action.name}' is not registered in Executor.")
+        meta = self._tool_meta.get(action.name)
+        if not meta:
+            logger.warning("⚠️ Action '{}' is not registered in Executor.", action.name)
             return f"Error: Tool {action.name} not found."
         
         # 🚩 4. Argument Filtering Logic
-        # Introspect the function signature to determine valid parameters
-        sig = inspect.signature(tool_func)
-        parameters = sig.parameters
-        
-        # Check if the function accepts variadic keyword arguments (**kwargs)
-        accepts_kwargs = any(p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters.values())
+        # Valid parameters and **kwargs support were introspected once at construction
+        tool_func, accepts_kwargs, parameters = meta
         
-        if accepts_kwargs:
+        if not accepts_kwargs and parameters.issuperset(action.payload):
+            # Common case: the Brain sent only valid arguments, nothing to filter
+            filtered_payload = action.payload
+        elif accepts_kwargs:
             # If the tool accepts **kwargs, we only filter out known "meta" keys 
             # added by the Brain/Engine to avoid polluting the tool logic.
             filtered_payload = {
                 k: v for k, v in action.payload.items() 
-                if k not in ['content', 'suggestions']
+                if k not in _META_KEYS
             }
         else:
             # Strict filtering: keep only parameters explicitly defined in the function signature
@@ -55,7 +65,7 @@ class AiiDAExecutor:
                 k: v for k, v in action.payload.items() 
                 if k in parameters
             }
-        logger.info(f"🛠️ Tool Calling: {action.name}")
+        logger.info("🛠️ Tool Calling: {}", action.name)
         
         try:
             # 5. Execute the tool function
@@ -63,5 +73,5 @@ class AiiDAExecutor:
             result = await asyncio.to_thread(tool_func, **filtered_payload)
             return result
         except Exception as e:
-            logger.exception(f"Exception during execution of {action.name}")
+            logger.exception("Exception during execution of {}", action.name)
             return f"Execution Error: {str(e)}"
\ No newline at end of file
@@ -7,12 +7,16 @@ from engines.aiida.tools import (
     list_local_archives
 )
 
+# 意图中的档案引用：Context: Inspect archive '<path>'
+_ARCHIVE_REF = re.compile(r"archive '(.+?)'")
+
 class AIIDASchemaPerceptor:
     def perceive(self, intent: str = None) -> Observation:
         target = None
+        profiles = None
         
         # 1. 路径解析逻辑 (保持原有的深度解析 🚀)
-        match = re.search(r"archive '(.+?)'", intent or "")
+        match = _ARCHIVE_REF.search(intent or "")
         if match:
             path_val = match.group(1)
             if path_val != "(None)" and os.path.exists(path_val):
@@ -24,7 +28,7 @@ class AIIDASchemaPerceptor:
 
         # 2. Profile 名称匹配 (保持原有逻辑 🚀)
         if not target and intent:
-            profiles = list_system_profiles() 
+            profiles = list_system_profiles()
             for p in profiles:
                 if p in intent:
                     target = p
@@ -40,7 +44,8 @@ class AIIDASchemaPerceptor:
         else:
             raw_report = user_msg + (
                 f"### AIIDA RESOURCE OVERVIEW ###\n"
-                f"Available Profiles: {list_system_profiles()}\n"
+                # 上面已经取过的 Profile 列表直接复用，不再重复读取配置
+                f"Available Profiles: {profiles if profiles is not None else list_system_profiles()}\n"
                 f"Available Archives: {list_local_archives()}\n"
             )
 
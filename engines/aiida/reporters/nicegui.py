@@ -1,11 +1,16 @@
 # engines/aiida/reporters/nicegui.py
+import asyncio
 import re
+from functools import partial
 from sab_core.reporters.base import BaseReporter
 from nicegui import ui
 
 class NiceGUIReporter(BaseReporter):
     def __init__(self, components):
         self.comp = components
+        # 最近一次观察的原始文本及其清洗结果：同一观察在多轮决策中重复到达时不再重新清洗
+        self._insight_raw = None
+        self._insight = ""
 
     def _format_insight_for_human(self, raw_observation: str) -> str:
         """
@@ -67,16 +72,21 @@ class NiceGUIReporter(BaseReporter):
         # 1. 🚩 更新 Insight 区域 (侧边栏)
         if "aiida" in observation.source:
             # 💡 调用清洗函数，不再使用 YAML 代码块包裹，以便正常显示 Markdown 图标
-            formatted_content = self._format_insight_for_human(observation.raw)
-            content = f"##### 📊 Insight\n\n{formatted_content}"
- 
-            self.comp['debug_log'].set_content(formatted_content)
-            
-            # 2. 🚩 动态激活样式：移除透明度，增加激活类名
-            self.comp['debug_log'].classes(add='insight-active opacity-100', remove='opacity-0')
-            # 3. 触发一次微小的“脉冲”动效
-            self.comp['debug_log'].classes(add='pill-breathing')
-            ui.timer(1.0, lambda: self.comp['debug_log'].classes(remove='pill-breathing'), once=True)
+            if observation.raw != self._insight_raw:
+                self._insight_raw = observation.raw
+                self._insight = self._format_insight_for_human(observation.raw)
+
+            debug_log = self.comp['debug_log']
+            # 🚩 面板内容未变时不再整块重发 Markdown，也不重复触发脉冲动效
+            if debug_log.content != self._insight:
+                debug_log.set_content(self._insight)
+
+                # 2. 🚩 动态激活样式：移除透明度，增加激活类名
+                debug_log.classes(add='insight-active opacity-100', remove='opacity-0')
+                # 3. 触发一次微小的“脉冲”动效
+                # 用事件循环的 call_later 移除脉冲类：不再为每一步创建一个一次性的 ui.timer 元素和闭包
+                debug_log.classes(add='pill-breathing')
+                asyncio.get_running_loop().call_later(1.0, partial(debug_log.classes, remove='pill-breathing'))
         # 2. 渲染对话气泡
         if action.name == "say":
             self._render_chat_message(action.payload.get("content", ""), is_ai=True)
@@ -121,7 +131,7 @@ class NiceGUIReporter(BaseReporter):
                 # 绑定点击
                 # 绑定点击事件
                 if ctrl:
-                    card.on('click', lambda t=text: ctrl.handle_send(t))
+                    card.on('click', partial(ctrl.handle_send, text))
                 else:
                     self.log("Warning: Controller not found in components, suggestions unclickable", level="WARN")
                                             
@@ -141,7 +151,7 @@ class NiceGUIReporter(BaseReporter):
                         ui.label(text).classes('text-sm font-bold')
                 
                 # 🚩 绑定点击事件：直接发送建议文本
-                card.on('click', lambda t=text: controller.handle_send(t))
+                card.on('click', partial(controller.handle_send, text))
 
     def debug(self, message: str, level: str = "INFO"):
         """Safe debug logging that prevents RuntimeError if UI is deleted."""
@@ -0,0 +1,67 @@
+# engines/aiida/tools/base/cache.py
+"""
+进程内的缓存工具。
+
+- `ttl_cache`：用于只读的数据库统计类工具。缓存键包含调用时的作用域（当前加载的 Archive），
+  切换档案后自然落到新的键上，重新选择同一档案或重复刷新时直接返回缓存结果，不再打数据库；
+  作用域为 `BYPASS` 时（例如可写的 Profile）直接调用，不读也不写缓存。
+- `SingleFlight`：合并并发的相同异步调用，只在调用进行期间共享，不缓存结果。
+"""
+import asyncio
+import threading
+import time
+from functools import wraps
+
+_cache = {}
+_lock = threading.Lock()
+
+# scope() 返回该值时本次调用不经过缓存
+BYPASS = object()
+
+
+def ttl_cache(seconds: float, scope=lambda: None, cache_if=lambda result: True):
+    """
+    Cache a function's result for `seconds`, keyed by `scope()` and the call arguments.
+
+    `cache_if(result)` decides whether a result is worth keeping (e.g. skip error replies);
+    when `scope()` returns `BYPASS` the call goes straight to `func`.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            current = scope()
+            if current is BYPASS:
+                return func(*args, **kwargs)
+            key = (func.__qualname__, current, args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            with _lock:
+                hit = _cache.get(key)
+            if hit is not None and hit[0] > now:
+                return hit[1]
+            result = func(*args, **kwargs)
+            if cache_if(result):
+                with _lock:
+                    _cache[key] = (now + seconds, result)
+            return result
+        return wrapper
+    return decorator
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical async calls into one task.
+
+    While a call for `key` is running, further callers await the same task;
+    the entry is dropped as soon as it finishes, so nothing is cached.
+    """
+    def __init__(self):
+        self._tasks = {}
+
+    async def run(self, key, start):
+        """Await the running task for `key`, or start one with `start()` (a coroutine factory)."""
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(start())
+            task.add_done_callback(lambda t: self._tasks.pop(key, None) if self._tasks.get(key) is t else None)
+        # shield：某个等待者被取消（如客户端断开）时不影响其它共用该任务的调用方
+        return await asyncio.shield(task)
@@ -3,6 +3,8 @@ Tools for inspecting the AiiDA profile (database statistics, groups).
 """
 import os
 import io
+import threading
+from collections import Counter
 import json      # 🚩 补上这个
 import zipfile   # 🚩 补上这个
 from pathlib import Path
@@ -11,39 +13,59 @@ from aiida.orm import Group, Node, QueryBuilder, ProcessNode, Node
 from aiida.manage.configuration import get_config
 from aiida.manage.manager import get_manager
 from aiida.storage.sqlite_zip.backend import SqliteZipBackend
+from ..base.cache import BYPASS, ttl_cache
 
 # 🚩 增加一个内存缓存，记录当前加载的 Archive 路径
 _CURRENT_MOUNTED_ARCHIVE = None
+# 当前已加载的目标（Archive 路径或 Profile 名称）；同一目标重复调用时直接返回
+_CURRENT_TARGET = None
+# 感知器、API 线程池和 UI 可能并发调用，切换环境必须串行
+_ENV_LOCK = threading.Lock()
+
+# 只读统计的缓存时长；键中包含当前档案，切换档案不会拿到别的档案的结果
+STATS_CACHE_TTL = 30.0
+
+def _archive_scope():
+    """只缓存只读的 Archive：可写的 Profile 上 Agent 可能刚提交了任务，统计必须实时"""
+    if _CURRENT_MOUNTED_ARCHIVE is not None and _CURRENT_MOUNTED_ARCHIVE == _CURRENT_TARGET:
+        return _CURRENT_MOUNTED_ARCHIVE
+    return BYPASS
 
 # --- 1. 资源列表工具 (Perceptor 强依赖) ---
 
 def ensure_environment(target: str):
     """
     智能切换环境：自动识别是本地 Profile 还是 Archive 文件。
+    幂等：目标已加载时不再重复 load_profile。
     """
-    global _CURRENT_MOUNTED_ARCHIVE
+    global _CURRENT_MOUNTED_ARCHIVE, _CURRENT_TARGET
 
     if not target or target == "(None)":
         return
 
-    if target == _CURRENT_MOUNTED_ARCHIVE:
+    # 无锁快速路径：绝大多数请求命中的都是当前环境
+    if target == _CURRENT_TARGET:
         return
 
-    try:
-        # 1. 如果是文件路径且存在
-        if os.path.isfile(target) and target.lower().endswith(('.aiida', '.zip')):
-            # 🚀 核心修复：将 Archive 文件路径包装成临时 Profile 对象
-            archive_profile = SqliteZipBackend.create_profile(filepath=target,)
-            load_profile(archive_profile, allow_switch=True)
-            _CURRENT_MOUNTED_ARCHIVE = target # 更新缓存
-            print(f"✅ Backend loaded archive as profile: {target}")
-        else:
-            # 2. 否则按普通 Profile 名称加载
-            load_profile(target, allow_switch=True)
-            _CURRENT_MOUNTED_ARCHIVE = None # 切换回普通 Profile
-            print(f"✅ Backend switched to profile: {target}")
-    except Exception as e:
-        print(f"❌ DEBUG: Failed to switch AiiDA environment: {e}")
+    with _ENV_LOCK:
+        if target == _CURRENT_TARGET:
+            return
+        try:
+            # 1. 如果是文件路径且存在
+            if os.path.isfile(target) and target.lower().endswith(('.aiida', '.zip')):
+                # 🚀 核心修复：将 Archive 文件路径包装成临时 Profile 对象
+                archive_profile = SqliteZipBackend.create_profile(filepath=target,)
+                load_profile(archive_profile, allow_switch=True)
+                _CURRENT_MOUNTED_ARCHIVE = target # 更新缓存
+                print(f"✅ Backend loaded archive as profile: {target}")
+            else:
+                # 2. 否则按普通 Profile 名称加载
+                load_profile(target, allow_switch=True)
+                _CURRENT_MOUNTED_ARCHIVE = None # 切换回普通 Profile
+                print(f"✅ Backend switched to profile: {target}")
+            _CURRENT_TARGET = target
+        except Exception as e:
+            print(f"❌ DEBUG: Failed to switch AiiDA environment: {e}")
 
 def list_system_profiles():
     """
@@ -73,8 +95,11 @@ def switch_profile(profile_name: str) -> str:
     if profile_name not in available:
         return f"Error: Profile '{profile_name}' not found. Available: {available}"
         
+    global _CURRENT_TARGET
     try:
-        load_profile(profile_name, allow_switch=True)
+        with _ENV_LOCK:
+            load_profile(profile_name, allow_switch=True)
+            _CURRENT_TARGET = profile_name
         return f"Successfully switched to profile '{profile_name}'."
     except Exception as e:
         return f"Error switching profile: {e}"
@@ -83,10 +108,13 @@ def load_archive_profile(filepath: str):
     """
     将压缩包作为临时 Profile 加载（主要用于 AiiDA 2.x 的只读探测）。
     """
+    global _CURRENT_TARGET
     try:
         from aiida.storage.sqlite_zip.backend import SqliteZipBackend
         archive_profile = SqliteZipBackend.create_profile(filepath = filepath)
-        load_profile(archive_profile, allow_switch=True)
+        with _ENV_LOCK:
+            load_profile(archive_profile, allow_switch=True)
+            _CURRENT_TARGET = filepath
         # 这里的实现取决于你的具体环境配置，通常建议直接通过 get_archive_info 探测
         # 如果需要完整加载，通常使用临时存储后端
         return f"Archive profile loading for '{filepath}' is ready for implementation."
@@ -119,6 +147,7 @@ def get_unified_source_map(target: str):
 
 # --- 4. 数据统计工具 ---
 
+@ttl_cache(STATS_CACHE_TTL, scope=_archive_scope)
 def get_statistics(profile_name: str = None):
     """
     获取数据库的高层统计信息。
@@ -141,23 +170,34 @@ def get_statistics(profile_name: str = None):
         
     return output.getvalue()
 
+@ttl_cache(STATS_CACHE_TTL, scope=_archive_scope)
 def list_groups(search_string: str = None):
     """
     以 Markdown 表格形式列出所有组，对 AI 非常友好。
     """
+    filters = {"type_string": {"!==": "core.import"}}
+    if search_string:
+        filters["label"] = {"like": f"%{search_string}%"}
+
     qb = QueryBuilder()
-    filters = {"label": {"like": f"%{search_string}%"}} if search_string else {}
-    qb.append(Group, project=["label", "id", "*"], filters=filters)
+    qb.append(Group, project=["label", "id"], filters=filters)
+    groups = qb.all()
+
+    # 🚩 一次查询取回所有成员关系再计数，而不是逐组 len(group.nodes) 加载全部节点
+    members = QueryBuilder()
+    members.append(Group, tag="group", project=["id"], filters=filters)
+    members.append(Node, with_group="group")
+    counts = Counter(pk for (pk,) in members.iterall())
     
     current = get_manager().get_profile().name
     lines = [f"**Groups in Profile: `{current}`**", "", "| PK | Label | Count |", "| :--- | :--- | :--- |"]
     
-    for label, pk, group in qb.all():
-        if group.type_string == "core.import": continue
-        lines.append(f"| {pk} | {label} | {len(group.nodes)} |")
+    for label, pk in groups:
+        lines.append(f"| {pk} | {label} | {counts[pk]} |")
     
     return "\n".join(lines)
 
+@ttl_cache(STATS_CACHE_TTL, scope=_archive_scope, cache_if=lambda r: r.get("status") == "success")
 def get_database_summary():
     """
     专门为 UI 迎宾界面设计的快速统计工具。
@@ -192,11 +232,12 @@ def get_recent_processes(limit: int = 5):
     qb.order_by({'process': {'ctime': 'desc'}})
     qb.limit(limit)
     
-    results = []
-    for pk, state, label, ctime in qb.all():
-        results.append({
+    # 投影出的 process_state 通常已是字符串：先走 isinstance 快路径，枚举/其它类型再转换
+    return [
+        {
             'pk': pk,
-            'state': state.value if hasattr(state, 'value') else str(state),
+            'state': state if isinstance(state, str) else (state.value if hasattr(state, 'value') else str(state)),
             'label': label or 'Unknown Task'
-        })
-    return results
\ No newline at end of file
+        }
+        for pk, state, label, ctime in qb.all()
+    ]
\ No newline at end of file
@@ -16,7 +16,8 @@ class ProcessTree:
             
             for sub in subprocesses:
                 # 获取 link_label
-                raw_label = sub.base.attributes.all.get("metadata_inputs", {}).get("metadata", {}).get("call_link_label")
+                # 只读取 metadata_inputs 这一项属性，而不是复制整个属性字典
+                raw_label = sub.base.attributes.get("metadata_inputs", {}).get("metadata", {}).get("call_link_label")
                 if not raw_label:
                     raw_label = getattr(sub, 'process_label', 'process')
                 
@@ -26,21 +27,29 @@ class ProcessTree:
                 
                 self.children[unique_label] = ProcessTree(sub, name=unique_label)
 
+    @property
+    def state(self) -> Optional[str]:
+        """树中的节点都是 ProcessNode：直接读取 process_state，未设置时为 None"""
+        process_state = self.node.process_state
+        return process_state.value if process_state is not None else None
+
     def to_dict(self) -> dict:
         """递归转化为字典，供 AI 或 UI 使用"""
+        state = self.state
         res = {
             "pk": self.node.pk,
             "name": self.name,
-            "process_label": getattr(self.node, "process_label", "N/A"),
-            "state": self.node.process_state.value if hasattr(self.node, 'process_state') else "N/A",
-            "exit_status": getattr(self.node, "exit_status", None),
+            "process_label": self.node.process_label or "N/A",
+            "state": state or "N/A",
+            "exit_status": self.node.exit_status,
             "children": [c.to_dict() for c in self.children.values()]
         }
         return res
 
     def print_tree(self, prefix: str = "", is_last: bool = True):
         connector = "└── " if is_last else "├── "
-        state = f" [{self.node.process_state.value}]" if hasattr(self.node, 'process_state') else ""
+        state = self.state
+        state = f" [{state}]" if state else ""
         print(f"{prefix}{connector}{self.name} (PK: {self.node.pk}){state}")
         
         new_prefix = prefix + ("    " if is_last else "│   ")
@@ -0,0 +1,151 @@
+# engines/aiida/ui/chat.py
+import time
+from functools import partial
+import markdown2
+from nicegui import ui
+
+# 每轮“思考”折叠区里的日志只保留最近若干行，超出后丢弃最旧的行
+DETAIL_LOG_MAX_LINES = 100
+
+# 聊天区最多保留的顶层元素数（每轮约 4 个：用户气泡、思考区、AI 气泡、建议按钮），超出后卸载最旧的
+CHAT_AREA_MAX_CHILDREN = 200
+
+# 流式回复的最小重绘间隔（约 30 fps）：片段先攒在列表里，每帧最多推送一次
+STREAM_PAINT_INTERVAL = 1 / 30
+# 流式期间滚动指令的最小间隔：比重绘更稀疏，避免每次重绘都多发一条 JS 消息
+STREAM_SCROLL_INTERVAL = 0.1
+
+# 滚动到底部：浏览器端用 requestAnimationFrame 合并，同一帧内的多次调用只滚动一次
+_SCROLL_TO_BOTTOM_JS = (
+    "if(!window.__sabrScroll){window.__sabrScroll=1;"
+    "requestAnimationFrame(()=>{window.scrollTo(0,document.body.scrollHeight);window.__sabrScroll=0;})}"
+)
+
+
+def scroll_to_bottom():
+    ui.run_javascript(_SCROLL_TO_BOTTOM_JS)
+
+
+# 终端时间戳按秒缓存：同一秒内的多行日志复用同一个字符串，不再逐行 now().strftime()
+_last_second = -1
+_last_stamp = ""
+
+
+def terminal_timestamp() -> str:
+    global _last_second, _last_stamp
+    second = int(time.time())
+    if second != _last_second:
+        _last_stamp = time.strftime("%H:%M:%S", time.localtime(second))
+        _last_second = second
+    return _last_stamp
+
+
+# 🚩 气泡与建议按钮的样式在两个控制器之间共享：集中定义为常量，改样式只需改一处
+_USER_ROW_CLS = 'w-full justify-end mb-6'
+_USER_LABEL_CLS = 'text-[10px] font-black opacity-30 pr-2 tracking-tighter'
+_USER_CARD_CLS = 'bg-primary/10 p-4 rounded-2xl shadow-none border-none'
+_AI_ROW_CLS = 'w-full justify-start mb-6'
+_AI_LABEL_CLS = 'text-[10px] font-black text-primary opacity-60 pl-1 tracking-tighter'
+_AI_CARD_CLS = 'bg-white/5 border border-white/10 p-4 rounded-2xl shadow-none'
+# 用户气泡内容不会再变：服务端把 Markdown 渲染一次，填进一段静态 HTML（1 个元素），
+# 而不是 row → column → label/card → markdown 五个元素；只使用 Tailwind 与 style.css 中的类
+_USER_BUBBLE_HTML = (
+    f'<div class="flex flex-row {_USER_ROW_CLS}">'
+    '<div class="flex flex-col items-end max-w-[80%]">'
+    f'<div class="{_USER_LABEL_CLS}">YOU</div>'
+    f'<div class="chat-bubble {_USER_CARD_CLS}" style="border-bottom-right-radius: 2px;">'
+    '<div class="chat-markdown text-slate-200 leading-relaxed">{body}</div>'
+    '</div></div></div>'
+)
+_USER_MARKDOWN_EXTRAS = ['fenced-code-blocks', 'tables']
+
+
+def _user_bubble_html(text: str) -> str:
+    """safe_mode='escape'：用户输入中的原始 HTML 被转义，Markdown 语法照常渲染"""
+    body = markdown2.markdown(text, extras=_USER_MARKDOWN_EXTRAS, safe_mode='escape')
+    return _USER_BUBBLE_HTML.format(body=body)
+
+
+# 流式阶段的纯文本占位：保留换行，结束后由 settle_stream 换成 Markdown
+_STREAM_CLS = 'whitespace-pre-wrap'
+_CHIP_ROW_CLS = 'flex-wrap gap-2 py-2 pl-12 mb-8 animate-fade-in'
+_CHIP_PROPS = 'outline rounded dense no-caps shadow-none'
+_CHIP_CLS = ('text-[11px] px-3 py-1 border-primary/20 text-primary/70 '
+             'hover:bg-primary/10 hover:border-primary transition-all bg-white/5 italic')
+
+
+def render_chat_bubble(container, text: str, role: str = 'user', streaming: bool = False):
+    """
+    Render a chat bubble into `container`.
+
+    Shared by the local and remote controllers so both draw the exact same
+    user (right, primary) and AI (left, avatar) bubbles. Returns the bubble's
+    row and its text element so callers can stream into or remove it; with
+    `streaming=True` the AI text is a plain label (see `settle_stream`).
+    """
+    trim_chat_area(container)
+    with container:
+        if role == 'user':
+            # User Bubble: Aligned Right, Primary theme（静态模板，Markdown 已在服务端渲染并转义）
+            row = markdown = ui.html(_user_bubble_html(text), sanitize=False).classes('w-full')
+        else:
+            # AI Bubble: Aligned Left, with Avatar and Secondary theme
+            with ui.row().classes(_AI_ROW_CLS) as row:
+                with ui.row().classes('items-start gap-3 no-wrap'):
+                    ui.avatar('auto_awesome', color='primary', text_color='white').props('size=sm shadow-lg')
+                    with ui.column().classes('max-w-[85%] items-start'):
+                        ui.label('SABR-AIIDA').classes(_AI_LABEL_CLS)
+                        with ui.card().classes(_AI_CARD_CLS).style('border-top-left-radius: 2px;'):
+                            if streaming:
+                                markdown = ui.label(text).classes(f'{_STREAM_CLS} text-slate-300 leading-relaxed')
+                            else:
+                                markdown = ui.markdown(text).classes('text-slate-300 leading-relaxed')
+    return row, markdown
+
+
+def settle_stream(stream_label, text: str):
+    """
+    Swap a streaming plain-text label for the final markdown.
+
+    During streaming only the label's text changes, so the growing reply is
+    never re-parsed as markdown; the full markdown pipeline runs once here.
+    """
+    classes = [c for c in stream_label.classes if c != _STREAM_CLS]
+    with stream_label.parent_slot:
+        markdown = ui.markdown(text).classes(' '.join(classes))
+    stream_label.delete()
+    return markdown
+
+
+def render_suggestion_chips(container, suggestions, on_pick):
+    """
+    Render clickable suggestion chips into `container`; `on_pick(text)` handles a click.
+
+    Handlers are `partial(on_pick, text)` rather than per-chip lambdas, so
+    callers can pass a bound method (e.g. `handle_send`) directly.
+    """
+    with container:
+        with ui.row().classes(_CHIP_ROW_CLS):
+            for text in suggestions:
+                ui.button(text, on_click=partial(on_pick, text)).props(_CHIP_PROPS).classes(_CHIP_CLS)
+
+
+def trim_chat_area(container, keep: int = CHAT_AREA_MAX_CHILDREN):
+    """卸载最旧的元素，让长对话的元素树（以及每次更新的开销）保持有界"""
+    children = container.default_slot.children
+    if len(children) > keep:
+        for element in children[:len(children) - keep]:
+            element.delete()
+
+
+def clear_chat_area(container):
+    """清空聊天区；已经为空时什么也不做，避免向客户端推送一次无意义的更新"""
+    if container.default_slot.children:
+        container.clear()
+
+
+def hide_insight(view):
+    """重置并隐藏见解面板；面板本就为空时跳过，每次发送消息不再重发内容与样式"""
+    if view is not None and view.content:
+        view.set_content('')
+        view.style('display: none;')
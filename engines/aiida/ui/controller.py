@@ -1,9 +1,40 @@
 import os
+import time
+from functools import partial
 import httpx
-import tkinter as tk
-from tkinter import filedialog
-from nicegui import ui, run
+import orjson
+from nicegui import ui
 from src.sab_core.protocols.controller import BaseController
+from engines.aiida.ui.chat import (
+    DETAIL_LOG_MAX_LINES, STREAM_PAINT_INTERVAL, clear_chat_area, hide_insight,
+    render_chat_bubble, render_suggestion_chips, scroll_to_bottom, settle_stream,
+    terminal_timestamp,
+)
+from engines.aiida.ui.dialogs import ask_for_archive_path
+
+# 所有标签页的控制器共用同一个 AsyncClient（按后端地址区分）：
+# keep-alive 连接在页面之间复用，打开新页面不再新建连接池
+_CLIENTS = {}
+
+
+def _shared_client(api_url: str) -> httpx.AsyncClient:
+    # 地址只在创建控制器时归一化一次："http://host/" 与 "http://host" 共用同一个连接池
+    api_url = api_url.strip().rstrip("/")
+    client = _CLIENTS.get(api_url)
+    if client is None or client.is_closed:
+        client = _CLIENTS[api_url] = httpx.AsyncClient(
+            base_url=api_url,
+            timeout=60.0,
+            limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=30.0),
+        )
+    return client
+
+
+# 进程状态的长轮询：单次最长挂起时间（需小于后端上限与 httpx 超时）、两次轮询的间隔、失败后的退避
+PROCESS_WATCH_WAIT = 25.0
+PROCESS_WATCH_TICK = 1.0
+PROCESS_WATCH_RETRY = 10.0
+
 
 class RemoteAiiDAController(BaseController):
     """
@@ -15,11 +46,18 @@ class RemoteAiiDAController(BaseController):
         super().__init__(engine=api_url, components=components)
         self.api_url = api_url
         self.global_mem = memory
-        self.client = httpx.AsyncClient(base_url=api_url, timeout=60.0)
+        self.client = _shared_client(api_url)
+        # 侧边栏中已渲染的档案条目：路径 → ui.item（重复加载时不再重复创建）
+        self._history_items = {}
         
         # 恢复你原来的状态绑定
         self._load_archive_history()
-        self.ticker_timer = ui.timer(10.0, self.update_process_status)
+        # 上次收到的进程快照版本；服务端无变化时返回 304，跳过解析与渲染
+        self._processes_etag = None
+        # 🚩 事件驱动：每次 tick 都是一次长轮询，后端快照变化时立即返回，
+        # 空闲时最多挂起 PROCESS_WATCH_WAIT 秒；NiceGUI 的 timer 会等回调结束后再计时
+        self._watch_retry_at = 0.0
+        self.ticker_timer = ui.timer(PROCESS_WATCH_TICK, self.update_process_status)
         self.terminal = components.get('thought_log')
         self.insight = components.get('insight_view')
 
@@ -28,31 +66,15 @@ class RemoteAiiDAController(BaseController):
     # ============================================================
 
     def _prepare_ui(self):
-        if 'insight_view' in self.components:
-            self.components['insight_view'].set_content('')
-            self.components['insight_view'].style('display: none;')
+        hide_insight(self.components.get('insight_view'))
         self.components['welcome_screen'].set_visibility(False)
         self.components['suggestion_container'].set_visibility(False)
         self.components['input'].value = ""
 
     def _create_chat_bubble(self, text: str, role: str = 'user'):
         """完美保留你之前的气泡样式"""
-        with self.components['chat_area']:
-            if role == 'user':
-                with ui.row().classes('w-full justify-end mb-6'):
-                    with ui.column().classes('items-end max-w-[80%]'):
-                        ui.label('YOU').classes('text-[10px] font-black opacity-30 pr-2 tracking-tighter')
-                        with ui.card().classes('bg-primary/10 p-4 rounded-2xl shadow-none border-none').style('border-bottom-right-radius: 2px;'):
-                            ui.markdown(text).classes('text-slate-200 leading-relaxed')
-            else:
-                with ui.row().classes('w-full justify-start mb-6'):
-                    with ui.row().classes('items-start gap-3 no-wrap'):
-                        ui.avatar('auto_awesome', color='primary', text_color='white').props('size=sm shadow-lg')
-                        with ui.column().classes('max-w-[85%] items-start'):
-                            ui.label('SABR-AIIDA').classes('text-[10px] font-black text-primary opacity-60 pl-1 tracking-tighter')
-                            with ui.card().classes('bg-white/5 border border-white/10 p-4 rounded-2xl shadow-none').style('border-top-left-radius: 2px;'):
-                                ui.markdown(text).classes('text-slate-300 leading-relaxed')
-        ui.run_javascript('window.scrollTo(0, document.body.scrollHeight)')
+        # 滚动统一留到 handle_send 结束时做一次
+        render_chat_bubble(self.components['chat_area'], text, role)
 
     # ============================================================
     # 📡 核心业务重构：API 驱动
@@ -60,7 +82,8 @@ class RemoteAiiDAController(BaseController):
 
     async def handle_send(self, preset_text=None):
         text = preset_text if preset_text else self.components['input'].value
-        if not text: return
+        # 🚩 防抖：重复点击不会再启动一轮完整的 Agent 运行
+        if not text or self._is_duplicate_submit(text): return
 
         self._prepare_ui()
         self._create_chat_bubble(text, role='user')
@@ -70,71 +93,113 @@ class RemoteAiiDAController(BaseController):
             with ui.expansion('', icon='psychology').classes('w-full mb-2 text-slate-400') as thought_exp:
                 with thought_exp.add_slot('header'):
                     thought_topic = ui.label('SABR is connecting to API...').classes('text-xs italic ml-2')
-                detail_log = ui.log().classes('w-full h-32 text-[10px] bg-slate-900/50 p-2')
+                detail_log = ui.log(max_lines=DETAIL_LOG_MAX_LINES).classes('w-full h-32 text-[10px] bg-slate-900/50 p-2')
             
-            # AI 回复容器 (用于流式更新)
-            with ui.row().classes('w-full justify-start mb-6') as ai_response_row:
-                 # 这里我们先不渲染内容，等 API 返回
-                 pass
+        # AI 回复气泡先挂载：流式阶段只更新纯文本，done 时再解析一次 Markdown
+        ai_row, ai_text = render_chat_bubble(self.components['chat_area'], '', 'ai', streaming=True)
+        # 只有 done 事件会定稿气泡；出错、断开或流在 done 之前结束时，空的/半截的气泡在 finally 里移除
+        settled = False
 
         try:
-            # 🚩 向远程后端发起请求
-            # 注意：此处为简化，使用普通 POST，若需流式则需后端支持 StreamingResponse
-            response = await self.client.post("/v1/chat", json={
-                "intent": text,
-                "context_archive": self.components['archive_select'].value
-            })
-            
-            if response.status_code == 200:
-                data = response.json()
-                thought_topic.set_text("Thinking completed.")
-                thought_exp.value = False # 自动折叠
-                
-                # 路由结果：决定去气泡还是去 Insight View
-                content = data.get('content', '')
-                if "|" in content and "---" in content:
-                    self._render_insight(content)
-                else:
-                    self._create_chat_bubble(content, role='ai')
-                
-                # 渲染建议按钮
-                if data.get('suggestions'):
-                    self.render_suggestion_chips(data['suggestions'])
-            else:
-                detail_log.push(f"❌ API Error: {response.status_code}")
+            # 🚩 走 SSE 流式接口：status 更新思考区，chunk 增量渲染，done 给出最终回复
+            payload = {"intent": text, "context_archive": self.components['archive_select'].value}
+            async with self.client.stream("POST", "/v1/chat/stream", json=payload) as response:
+                if response.status_code != 200:
+                    detail_log.push(f"❌ API Error: {response.status_code}")
+                    return
+
+                chunks, last_paint = [], 0.0
+                async for line in response.aiter_lines():
+                    # 空行与保活注释帧 (": ping") 直接跳过
+                    if not line.startswith("data: "):
+                        continue
+                    event = orjson.loads(line[6:])
+
+                    if event['type'] == 'status':
+                        thought_topic.set_text(event['topic'])
+                        detail_log.push(f"⚙️ {event['topic']}")
+
+                    elif event['type'] == 'chunk':
+                        chunks.append(event['text'])
+                        # 限制重绘频率：每帧最多一次 set_content，避免逐 token 重发整段 Markdown
+                        now = time.monotonic()
+                        if now - last_paint >= STREAM_PAINT_INTERVAL:
+                            ai_text.set_text(''.join(chunks))
+                            last_paint = now
+
+                    elif event['type'] == 'done':
+                        action = event['action']
+                        settled = True
+                        thought_topic.set_text("Thinking completed.")
+                        thought_exp.value = False # 自动折叠
+
+                        # 路由结果：决定去气泡还是去 Insight View
+                        content = action.get('payload', {}).get('content', '') or ''.join(chunks)
+                        if "|" in content and "---" in content:
+                            self._render_insight(content)
+                            ai_row.delete()
+                        else:
+                            settle_stream(ai_text, content)
+
+                        # 渲染建议按钮
+                        if action.get('suggestions'):
+                            self.render_suggestion_chips(action['suggestions'])
+
+                    elif event['type'] == 'error':
+                        detail_log.push(f"❌ Error: {event['detail']}")
+                        thought_topic.set_text("Thinking interrupted by error.")
         except Exception as e:
             detail_log.push(f"❌ Connection Error: {str(e)}")
         finally:
-            ui.run_javascript('window.scrollTo(0, document.body.scrollHeight)')
+            if not settled:
+                ai_row.delete()
+            scroll_to_bottom()
+
+    def render_suggestion_chips(self, suggestions):
+        """与本地控制器共用同一套建议按钮"""
+        render_suggestion_chips(self.components['chat_area'], suggestions, self.handle_send)
 
     async def update_process_status(self):
-        """远程获取进程状态 Ticker"""
+        """远程获取进程状态：带上 ETag 长轮询，只有快照变化时才返回新数据"""
         archive = self.components['archive_select'].value
         if not archive or archive == "(None)": return
+        # 后端不可用时退避，不在每个 tick 上重复失败的连接
+        if time.monotonic() < self._watch_retry_at: return
 
         try:
-            r = await self.client.get("/v1/aiida/processes")
+            if self._processes_etag:
+                r = await self.client.get("/v1/aiida/processes",
+                                          params={"wait": PROCESS_WATCH_WAIT},
+                                          headers={"If-None-Match": self._processes_etag})
+            else:
+                r = await self.client.get("/v1/aiida/processes")
             if r.status_code == 200:
-                processes = r.json()
+                self._processes_etag = r.headers.get("ETag")
+                if not self._processes_etag:
+                    # 后端没有共享快照（无法长轮询）：退回原来的 10s 定时轮询节奏
+                    self._watch_retry_at = time.monotonic() + PROCESS_WATCH_RETRY
+                processes = orjson.loads(r.content)
                 # 这里的渲染逻辑可以根据你的 Reporter 结构进行调整
                 # 简单起见，如果 components 里有状态条，直接更新
                 self._render_terminal(f"Backend Ticker: {len(processes)} active processes found.", "DEBUG")
+            elif r.status_code != 304:
+                self._watch_retry_at = time.monotonic() + PROCESS_WATCH_RETRY
         except:
-            pass
+            self._watch_retry_at = time.monotonic() + PROCESS_WATCH_RETRY
 
     async def switch_context(self, path: str):
         """实现基类的上下文切换"""
         if not path or path == '(None)': return
         filename = os.path.basename(path)
         
-        self.components['chat_area'].clear()
+        clear_chat_area(self.components['chat_area'])
         self.components['welcome_screen'].set_visibility(True)
         
         try:
             # 🚩 向 API 获取数据库概要
             r = await self.client.get("/v1/aiida/summary")
             if r.status_code == 200:
-                stats = r.json()
+                stats = orjson.loads(r.content)
                 self.components['welcome_title'].set_text(f"Loaded {filename}")
                 self.components['welcome_sub'].set_text(
                     f"Database ready: {stats['node_count']} nodes • {stats['process_count']} processes"
@@ -152,7 +217,7 @@ class RemoteAiiDAController(BaseController):
         try:
             r = await self.client.get(f"/v1/aiida/nodes/{node_pk}")
             if r.status_code == 200:
-                details = r.json()
+                details = orjson.loads(r.content)
                 # 渲染到 Debug/Insight 面板
                 self.components['insight_view'].set_content(f"## Node {node_pk}\n```json\n{details}\n```")
                 self.components['insight_view'].style('display: block;')
@@ -165,9 +230,7 @@ class RemoteAiiDAController(BaseController):
     
     def _render_terminal(self, message: str, level: str):
         if not self.terminal: return
-        import datetime
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        self.terminal.push(f"[{timestamp}] {level}: {message}")
+        self.terminal.push(f"[{terminal_timestamp()}] {level}: {message}")
 
     def _render_insight(self, message: str):
         if not self.insight: return
@@ -176,27 +239,29 @@ class RemoteAiiDAController(BaseController):
 
     def _load_archive_history(self):
         history = self.global_mem.get_raw_data("recent_archives") or []
-        self.components['archive_select'].options = history
-        with self.components['archive_history']:
-            for path in history:
-                self._add_to_history_ui(path)
+        # 选项未变化时不重新赋值，避免向客户端推送一次无意义的更新
+        if self.components['archive_select'].options != history:
+            self.components['archive_select'].options = history
+        for path in history:
+            self._add_to_history_ui(path)
 
     def _add_to_history_ui(self, path: str):
+        if path in self._history_items: return
         filename = os.path.basename(path)
         with self.components['archive_history']:
-            ui.item(on_click=lambda: self.switch_context(path)).classes('px-8 py-2 rounded-xl hover:bg-white/5 cursor-pointer') \
-                .child(ui.label(filename).classes('text-[11px] text-slate-400'))
+            item = ui.item(on_click=partial(self.switch_context, path)).classes('px-8 py-2 rounded-xl hover:bg-white/5 cursor-pointer')
+            with item:
+                ui.label(filename).classes('text-[11px] text-slate-400')
+        self._history_items[path] = item
 
     async def pick_local_file(self):
         """保持 tkinter 逻辑，因为它是在客户端运行的"""
-        def get_path():
-            root = tk.Tk(); root.withdraw(); root.attributes('-topmost', True)
-            p = filedialog.askopenfilename(filetypes=[("AiiDA Archives", "*.aiida *.zip")])
-            root.destroy()
-            return p
-        selected_path = await run.io_bound(get_path)
+        selected_path = await ask_for_archive_path()
         if selected_path:
-            self.switch_context(selected_path)
+            await self.switch_context(selected_path)
 
     async def close(self):
-        await self.client.aclose()
\ No newline at end of file
+        """应用关闭时释放共享的连接池（重复调用是安全的）"""
+        for client in list(_CLIENTS.values()):
+            await client.aclose()
+        _CLIENTS.clear()
\ No newline at end of file
@@ -0,0 +1,76 @@
+# engines/aiida/ui/dialogs.py
+"""
+Native file dialogs served from one long-lived Tk thread.
+
+Tk objects must stay on the thread that created them, so instead of spinning up
+a fresh `tk.Tk()` inside whatever worker thread `run.io_bound` happens to pick,
+a single daemon thread owns a hidden root and services dialog requests from a
+queue. Callers await the reply without blocking the event loop.
+
+tkinter is imported lazily on that thread, so processes that never open a
+dialog (and headless servers, which cannot) never pay for it.
+"""
+import asyncio
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import Future
+
+ARCHIVE_FILETYPES = [("AiiDA Archives", "*.aiida *.zip")]
+
+_requests = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _has_display() -> bool:
+    """Linux 等系统上没有 X11/Wayland 显示时无法弹出原生对话框"""
+    if sys.platform in ("win32", "darwin"):
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def _tk_worker():
+    """Tk 专用线程：独占一个隐藏的 root，串行处理所有对话框请求"""
+    try:
+        import tkinter as tk
+        from tkinter import filedialog
+        root = tk.Tk()
+        root.withdraw()
+        root.attributes('-topmost', True)
+        init_error = None
+    except Exception as e:
+        # 无显示环境等情况下 Tk 无法启动：之后的请求直接以该异常失败，避免永久挂起
+        filedialog, root, init_error = None, None, e
+
+    while True:
+        dialog, kwargs, future = _requests.get()
+        if not future.set_running_or_notify_cancel():
+            continue
+        if init_error is not None:
+            future.set_exception(init_error)
+            continue
+        try:
+            future.set_result(getattr(filedialog, dialog)(parent=root, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_tk_worker, name="tk-dialog", daemon=True)
+            _worker.start()
+
+
+async def ask_for_archive_path() -> str:
+    """Open the native "open archive" dialog and return the chosen path ('' if cancelled or headless)."""
+    if not _has_display():
+        print("⚠️ [Dialog] No display available, native file dialog skipped.")
+        return ''
+    _ensure_worker()
+    future = Future()
+    _requests.put(("askopenfilename", {"filetypes": ARCHIVE_FILETYPES}, future))
+    return await asyncio.wrap_future(future)
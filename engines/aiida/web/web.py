@@ -1,24 +1,51 @@
-import os
+import zlib
+from functools import lru_cache
+from pathlib import Path
 from nicegui import app, ui
 from engines.aiida.web.themes import THEMES
 
 app.add_static_files('/aiida/static', 'engines/aiida/static')
 
-
-
-def create_layout(theme_name='gemini_dark', available_models=[None]):
+# 🚩 样式表版本号：用文件内容的 crc32 指纹代替每次渲染都变的随机串，
+# 内容不变时浏览器可以继续使用缓存；只在导入时计算一次
+_STYLE_VERSION = format(zlib.crc32(Path('engines/aiida/static/style.css').read_bytes()), '08x')
+
+# 🚩 快捷卡片与默认模型都是常量：导入时构建一次，每次渲染布局直接复用
+# (标题, 副标题, 完整意图)
+QUICK_PROMPTS = (
+    ('📊 DB Statistics', 'Overview of nodes', 'Show me the statistics of current database'),
+    ('🔍 Group Explorer', 'Identify user groups', 'List all groups in this archive'),
+    ('⚡ Recent Activity', 'Last 5 successful tasks', 'What are the last 5 successful processes?'),
+    ('🛠️ PW Relax', 'Draft QE WorkChain', 'Help me draft a PW relax workchain'),
+)
+DEFAULT_MODELS = (None,)
+# 终端日志的保留行数：超出后最旧的行被丢弃，长会话中 DOM 与内存不再无限增长
+THOUGHT_LOG_MAX_LINES = 500
+
+
+@lru_cache(maxsize=None)
+def _theme_css(theme_name: str) -> str:
+    """每个主题的 CSS 变量块只拼接一次"""
     theme = THEMES.get(theme_name, THEMES['gemini_dark'])
-    theme_css = ":root {\n" + "\n".join([f"    {k}: {v};" for k, v in theme.items()]) + "\n}"
+    return ":root {\n" + "\n".join([f"    {k}: {v};" for k, v in theme.items()]) + "\n}"
+
 
-    ui.add_head_html(f'''
-        <link rel="stylesheet" href="/aiida/static/style.css?v={os.urandom(4).hex()}">
-        <style>{theme_css}</style>
+@lru_cache(maxsize=None)
+def _head_html(theme_name: str) -> str:
+    """注入 <head> 的整段 HTML 只随主题变化：按主题拼接一次，之后每个页面直接复用同一个字符串"""
+    return f'''
+        <link rel="stylesheet" href="/aiida/static/style.css?v={_STYLE_VERSION}">
+        <style>{_theme_css(theme_name)}</style>
         <script>
             function inspectNode(nodeId) {{
                 emitEvent('node_clicked', {{id: nodeId}});
             }}
         </script>
-    ''')
+    '''
+
+
+def create_layout(theme_name='gemini_dark', available_models=DEFAULT_MODELS):
+    ui.add_head_html(_head_html(theme_name))
 
     # --- 1. 侧边栏 ---
     ICON_W = "w-[40px]"
@@ -99,7 +126,7 @@ def create_layout(theme_name='gemini_dark', available_models=[None]):
                             icon_more = ui.icon('expand_more', size='16px')
                         # 🚩 3. 终端内容区 (Log Body)
                     with ui.column().classes('w-full') as log_container:
-                        thought_log = ui.log().classes(
+                        thought_log = ui.log(max_lines=THOUGHT_LOG_MAX_LINES).classes(
                             'thought-log-container w-full h-50 text-[10px] p-3 '
                             'bg-[#0a0a0a] rounded-b-xl border-x border-b border-white/5 '
                             'font-mono leading-relaxed'
@@ -137,13 +164,7 @@ def create_layout(theme_name='gemini_dark', available_models=[None]):
             
             with ui.element('div').classes('suggestion-grid') as suggestion_container:
                 suggestion_cards = []
-                prompts = [
-                    ('📊 DB Statistics', 'Overview of nodes', 'Show me the statistics of current database'),
-                    ('🔍 Group Explorer', 'Identify user groups', 'List all groups in this archive'),
-                    ('⚡ Recent Activity', 'Last 5 successful tasks', 'What are the last 5 successful processes?'),
-                    ('🛠️ PW Relax', 'Draft QE WorkChain', 'Help me draft a PW relax workchain')
-                ]
-                for title, subtitle, full_intent in prompts:
+                for title, subtitle, full_intent in QUICK_PROMPTS:
                     card = ui.card().classes('suggestion-card cursor-pointer shadow-none')
                     with card:
                         with ui.column().classes('gap-1'):
@@ -159,7 +180,7 @@ def create_layout(theme_name='gemini_dark', available_models=[None]):
             with ui.row().classes('w-full items-center justify-between'):
                 # 🚩 补全模型选择器
                 model_select = ui.select(
-                        options=available_models,
+                        options=list(available_models),
                         value=available_models[0]
                     ).props(
                         # borderless: 去掉下划线
@@ -5,8 +5,17 @@ A lightweight, decoupled foundational library for AI Agents using Gemini as the
 Interface-first design: Perception → Decision (Brain) → Execution.
 """
 
-from sab_core.brain import GeminiBrain
-from sab_core.engine import SABEngine
-
 __version__ = "0.1.0"
 __all__ = ["GeminiBrain", "SABEngine"]
+
+
+def __getattr__(name):
+    # Lazy exports: importing a submodule (e.g. sab_core.config for the remote web UI)
+    # no longer pulls in the Gemini SDK; it is loaded on first access instead.
+    if name == "GeminiBrain":
+        from sab_core.brain import GeminiBrain
+        return GeminiBrain
+    if name == "SABEngine":
+        from sab_core.engine import SABEngine
+        return SABEngine
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
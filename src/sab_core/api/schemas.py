@@ -1,12 +1,15 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional, Any
 
 class AgentRequest(BaseModel):
+    # 每个聊天请求都会实例化：只读、首尾空白在 Rust 端校验时一并去掉
+    model_config = ConfigDict(frozen=True, str_strip_whitespace=True)
+
     intent: str
     context_archive: Optional[str] = None
 
 class AgentResponse(BaseModel):
     content: str            # AI 的话语
     action_name: str        # 执行的操作名
-    result: Any             # AiiDA 执行的真实结果
+    result: Any = None      # AiiDA 执行的真实结果（为空时不序列化）
     suggestions: List[str]  # 建议
\ No newline at end of file
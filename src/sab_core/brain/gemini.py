@@ -1,18 +1,55 @@
 # src/sab_core/brain/gemini.py
+import copy
 import json
 import os
 import re
+import threading
+import time
+from functools import lru_cache
 from google import genai
 from google.genai import types
 from sab_core.schema.action import Action
 from sab_core.schema.observation import Observation
 from sab_core.brain.parser import ResponseParser
 
+# 🚩 进程级模型列表缓存，按 API Key 区分：所有 Brain 实例 / 会话共享，过期前不再请求远程
+MODELS_CACHE_TTL = 900.0
+_MODELS_CACHE: dict[str | None, tuple[float, list[str]]] = {}
+_MODELS_CACHE_LOCK = threading.Lock()
+
+def _clean_schema(schema):
+    """Recursively remove 'additionalProperties' and 'title' for Gemini API."""
+    # Dispatch on the exact type: JSON schemas only contain plain dicts/lists/scalars
+    kind = type(schema)
+    if kind is dict:
+        # Remove keys forbidden by Gemini Structured Output
+        schema.pop('additionalProperties', None)
+        schema.pop('title', None) # 'title' can also cause issues in some versions
+        for value in schema.values():
+            _clean_schema(value)
+    elif kind is list:
+        for item in schema:
+            _clean_schema(item)
+    return schema
+
+
+@lru_cache(maxsize=1)
+def _cached_action_schema() -> dict:
+    """The Action schema never changes at runtime: generate and clean it once, not on every decision."""
+    return _clean_schema(Action.model_json_schema())
+
+
+def _action_schema() -> dict:
+    """A private copy of the cached schema per request, since the SDK may normalise it in place."""
+    return copy.deepcopy(_cached_action_schema())
+
+
 class GeminiBrain:
     def __init__(self, *, model_name: str = "gemini-2.0-flash", api_key: str | None = None, 
                  system_prompt: str = "", tools: list = None, http_options: dict = None) -> None:
         key = api_key or os.environ.get("GEMINI_API_KEY")
         self._client = genai.Client(api_key=key, http_options=http_options)
+        self._api_key = key
         self._model_name = model_name
         self._system_prompt = system_prompt
         # 这里的 tools 是函数引用列表
@@ -23,28 +60,9 @@ class GeminiBrain:
         current_prompt = f"Observation Source: {observation.source}\nContent: {observation.raw}"
         contents.append(types.Content(role="user", parts=[types.Part(text=current_prompt)]))
 
-        def clean_schema(schema: dict):
-            """Recursively remove 'additionalProperties' and 'title' for Gemini API."""
-            if not isinstance(schema, dict):
-                return schema
-            
-            # Remove keys forbidden by Gemini Structured Output
-            schema.pop('additionalProperties', None)
-            schema.pop('title', None) # 'title' can also cause issues in some versions
-            
-            for key, value in schema.items():
-                if isinstance(value, dict):
-                    clean_schema(value)
-                elif isinstance(value, list):
-                    for item in value:
-                        if isinstance(item, dict):
-                            clean_schema(item)
-            return schema
-
         try:
-            # 1. 🚩 Prepare and clean the schema dictionary
-            raw_schema = Action.model_json_schema()
-            action_schema = clean_schema(raw_schema)
+            # 1. 🚩 The cleaned Action schema is built once per process and reused
+            action_schema = _action_schema()
 
             # 🚩 KEY CHANGE: Configure for Type-Safe Structured Output
             response = await self._client.aio.models.generate_content(
@@ -99,8 +117,21 @@ class GeminiBrain:
             
     def get_available_models(self) -> list[str]:
         """
-        使用新版 google-genai SDK 动态获取模型列表
+        使用新版 google-genai SDK 动态获取模型列表（按 API Key 缓存 MODELS_CACHE_TTL 秒）
         """
+        # 持锁查询：并发的首次请求只会触发一次远程调用
+        with _MODELS_CACHE_LOCK:
+            cached = _MODELS_CACHE.get(self._api_key)
+            if cached and time.monotonic() - cached[0] < MODELS_CACHE_TTL:
+                return list(cached[1])
+            models = self._fetch_models()
+            if models is not None:
+                _MODELS_CACHE[self._api_key] = (time.monotonic(), models)
+                return list(models)
+        return ['gemini-2.0-flash', 'gemini-1.5-pro']
+
+    def _fetch_models(self) -> list[str] | None:
+        """远程获取支持 generateContent 的模型；失败时返回 None（不写入缓存）"""
         try:
             available = []
             for m in self._client.models.list():
@@ -112,7 +143,7 @@ class GeminiBrain:
             return sorted(available, key=lambda x: ("2.0" not in x, x))
         except Exception as e:
             print(f"Failed to fetch models: {e}")
-            return ['gemini-2.0-flash', 'gemini-1.5-pro']
+            return None
 
     async def stream_decide(self, observation: Observation, history: list | None = None):
         """Streaming version of decision making."""
@@ -120,15 +151,8 @@ class GeminiBrain:
         current_prompt = f"Observation Source: {observation.source}\nContent: {observation.raw}"
         contents.append(types.Content(role="user", parts=[types.Part(text=current_prompt)]))
 
-        # Prepare cleaned schema for Structured Output
-        def clean_schema(schema: dict):
-            if not isinstance(schema, dict): return schema
-            schema.pop('additionalProperties', None)
-            schema.pop('title', None)
-            for v in schema.values(): clean_schema(v)
-            return schema
-
-        action_schema = clean_schema(Action.model_json_schema())
+        # Cleaned schema for Structured Output (shared with decide)
+        action_schema = _action_schema()
 
         # 🚩 Use generate_content_stream for token streaming
         async for chunk in await self._client.aio.models.generate_content_stream(
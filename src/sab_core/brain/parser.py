@@ -3,6 +3,7 @@ import json
 import re
 import logging
 from typing import Any, List, Optional
+import orjson
 try:
     import json_repair # Use json_repair to handle malformed JSON
 except ImportError:
@@ -10,6 +11,10 @@ except ImportError:
 
 from sab_core.schema.action import Action
 
+# Precompiled patterns for the slow (repair) path
+_CODE_FENCE = re.compile(r'```json\s*|\s*```')
+_JSON_OBJECT = re.compile(r'(\{.*\})', re.DOTALL)
+
 class ResponseParser:
     """
     Parser for LLM responses with multiple strategies: 
@@ -45,18 +50,12 @@ class ResponseParser:
     def _from_json(cls, text: str) -> Optional[Action]:
         """Attempt to extract and repair JSON from raw text."""
         try:
-            # Clean Markdown code blocks if present
-            clean_text = re.sub(r'```json\s*|\s*```', '', text).strip()
-            
-            # Use json_repair if available, otherwise fallback to standard json
-            if json_repair:
-                data = json_repair.loads(clean_text)
-            else:
-                # Basic bracket extraction as a last resort before standard json.loads
-                match = re.search(r'(\{.*\})', clean_text, re.DOTALL)
-                if match:
-                    data = json.loads(match.group(1))
-                else:
+            # Fast path: structured output usually arrives as a bare JSON object
+            try:
+                data = orjson.loads(text)
+            except orjson.JSONDecodeError:
+                data = cls._repair_json(text)
+                if data is None:
                     return None
 
             if isinstance(data, dict):
@@ -76,6 +75,21 @@ class ResponseParser:
             return None
         return None
 
+    @staticmethod
+    def _repair_json(text: str) -> Any:
+        """Strip Markdown fences and repair/extract a JSON object from free text."""
+        # Clean Markdown code blocks if present
+        clean_text = _CODE_FENCE.sub('', text).strip()
+
+        # Use json_repair if available, otherwise fallback to standard json
+        if json_repair:
+            return json_repair.loads(clean_text)
+        # Basic bracket extraction as a last resort before standard json.loads
+        match = _JSON_OBJECT.search(clean_text)
+        if match:
+            return json.loads(match.group(1))
+        return None
+
     @classmethod
     def _from_regex_fallback(cls, text: str) -> Action:
         """Handle plain text responses with legacy [SUGGESTIONS]: markers."""
@@ -9,5 +9,12 @@ class Config:
     MEMORY_DIR = os.getenv("SABR_MEMORY_DIR", "data/memories")
     DEBUG_LEVEL = os.getenv("SABR_DEBUG_LEVEL", "INFO")
     ENGINE_TYPE = os.getenv("ENGINE_TYPE", "aiida")
+    # Upper bound (seconds) for a single agent run served by the API
+    AGENT_TIMEOUT = float(os.getenv("SABR_AGENT_TIMEOUT", "300"))
+    # Maximum number of agent runs the API serves at the same time
+    MAX_CONCURRENT_CHATS = int(os.getenv("SABR_MAX_CONCURRENT_CHATS", "4"))
+    # Base URL of the API backend used by the remote web UI.
+    # Normalised once here so request paths can be appended without re-stripping per call.
+    API_URL = os.getenv("SABR_API_URL", "http://127.0.0.1:8000").strip().rstrip("/")
     
 settings = Config()
\ No newline at end of file
@@ -1,13 +1,18 @@
 # src/sab_core/engine.py (核心升级)
+import asyncio
 from sab_core.protocols.perception import Perceptor
 from sab_core.protocols.brain import Brain
 from sab_core.protocols.executor import Executor
 from sab_core.protocols.reporter import Reporter
 from sab_core.protocols.memory import Memory
 from sab_core.schema.observation import Observation # 🚩 确保导入了这个类
+from sab_core.schema.action import Action
 from typing import List, Dict, Any
 from sab_core.schema.response import Response
 
+# Actions that end a streaming run (no tool to execute)
+_TERMINAL_ACTIONS = frozenset({"say", "error_reported"})
+
 class SABEngine:
     def __init__(
         self, 
@@ -24,6 +29,8 @@ class SABEngine:
         self._brain = brain
         self._executor = executor
         self._reporters = reporters
+        # 🚩 一次性解析支持 debug 的 Reporter，日志热路径不再逐条 hasattr
+        self._debug_sinks = [r.debug for r in reporters if hasattr(r, 'debug')]
         self._memory = memory  # 🚩 新增 Memory 组件
         self._max_recursions = max_recursions
         self._enable_reflection = enable_reflection
@@ -31,14 +38,16 @@ class SABEngine:
 
     def log(self, message: str, level: str = "INFO"):
         """将调试信息广播给所有绑定的 Reporter"""
-        for reporter in self._reporters:
-            if hasattr(reporter, 'debug'):
-                reporter.debug('> ' + message, level)
+        if not self._debug_sinks:
+            return
+        for debug in self._debug_sinks:
+            debug('> ' + message, level)
 
     async def run_once(self, intent: str):
         """Agentic loop with error-break and reflection."""
         self.log(f"Starting mission: {intent}", level="INFO")
-        observation = self._perceptor.perceive(intent)
+        # 感知会查询数据库 / 切换 Profile：放到线程里，避免阻塞事件循环
+        observation = await asyncio.to_thread(self._perceptor.perceive, intent)
         
         current_recursion = 0
         last_result = None
@@ -89,11 +98,13 @@ class SABEngine:
 
             # Step 4: Execution (if tool call)
             result = await self._executor.execute(action)
+            # 大结果只字符串化一次，摘要与下一轮观察共用
+            result_text = str(result)
             # 🚩 改进：在循环内记录“中间动作”，供反思参考
             if self._memory:
                 self._memory.store_action({
                     "action": action.name,
-                    "result_summary": str(result)[:100],
+                    "result_summary": result_text[:100],
                     "success": True if result else False
                 })
 
@@ -106,7 +117,7 @@ class SABEngine:
             # Step 6: Update Observation for next cycle
             observation = Observation(
                 source=f"executor:{action.name}",
-                raw=f"Execution Result of {action.name}: {str(result)}"
+                raw=f"Execution Result of {action.name}: {result_text}"
             )
             
             current_recursion += 1
@@ -165,7 +176,7 @@ class SABEngine:
     async def run_stream(self, intent: str):
         """Yields events: {'type': 'status', 'topic': '...'} or {'type': 'chunk', 'text': '...'}"""
         yield {"type": "status", "topic": "Perceiving context..."}
-        observation = self._perceptor.perceive(intent)
+        observation = await asyncio.to_thread(self._perceptor.perceive, intent)
         
         current_recursion = 0
         while current_recursion < self._max_recursions:
@@ -176,11 +187,12 @@ class SABEngine:
             yield {"type": "status", "topic": f"Thinking (Cycle {current_recursion + 1})..."}
             
             # Start streaming from Brain
-            full_text = ""
+            # Collect chunks in a list and join once: `str +=` would copy the whole buffer per chunk
+            text_chunks = []
             async for chunk in self._brain.stream_decide(enhanced_obs, history=history):
                 if isinstance(chunk, str):
                     # It's a text chunk
-                    full_text += chunk
+                    text_chunks.append(chunk)
                     yield {"type": "chunk", "text": chunk}
                 else:
                     # It's a function call (terminal for streaming text in this turn)
@@ -188,9 +200,9 @@ class SABEngine:
                     break
             else:
                 # If loop finished normally, parse the full_text as JSON Action
-                action = Action.model_validate_json(full_text)
+                action = Action.model_validate_json(''.join(text_chunks))
 
-            if action.name in ["say", "error_reported"]:
+            if action.name in _TERMINAL_ACTIONS:
                 yield {"type": "done", "action": action}
                 return
 
@@ -2,6 +2,7 @@
 import json
 import os
 from typing import List, Dict, Any
+import orjson
 from ..protocols.memory import Memory
 
 class JSONMemory(Memory):
@@ -13,6 +14,9 @@ class JSONMemory(Memory):
         self.path = os.path.join(storage_dir, f"history_{namespace}.json")
         os.makedirs(storage_dir, exist_ok=True)
         self.data = self._load_full_dict()
+        # Bumped when turns/summary change; get_context() reuses its last result while it is unchanged
+        self._version = 0
+        self._context_cache = None
 
     @property
     def action_history(self) -> List[Dict]:
@@ -35,13 +39,14 @@ class JSONMemory(Memory):
         if not isinstance(value, list):
             value = []
         self.data["turns"] = value
+        self._version += 1
 
     def _load_full_dict(self) -> Dict:
         """Load the JSON file and ensure it follows the dictionary structure."""
         if os.path.exists(self.path):
-            with open(self.path, 'r', encoding='utf-8') as f:
+            with open(self.path, 'rb') as f:
                 try:
-                    content = json.load(f)
+                    content = orjson.loads(f.read())
                     if isinstance(content, dict):
                         # Ensure essential keys are present for summarization
                         content.setdefault("turns", [])
@@ -62,13 +67,14 @@ class JSONMemory(Memory):
         return {"summary": "", "history": [], "action_history": []}
 
     def _save(self):
-        """Save state to disk."""
-        with open(self.path, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        """Save state to disk (called after every stored turn/action, so encode with orjson)."""
+        with open(self.path, 'wb') as f:
+            f.write(orjson.dumps(self.data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
 
     def store(self, turn_data: Dict[str, Any]):
         """Store a final dialogue turn (Intent + Response)."""
         self.turns.append(turn_data)
+        self._version += 1
         # Clear intermediate actions after a turn is finalized
         self.data["action_history"] = [] 
         self._save()
@@ -93,22 +99,29 @@ class JSONMemory(Memory):
 
     def get_context(self, limit: int = 10) -> List[Any]:
         """Combine global summary with recent history for context injection."""
+        cached = self._context_cache
+        if cached is not None and cached[0] == (self._version, limit):
+            # Callers append the current prompt to the returned list: hand out a copy
+            return list(cached[1])
+
         context = []
         if self.data.get("summary"):
             context.append({"role": "user", "parts": [{"text": f"SYSTEM RECAP: {self.data['summary']}"}]})
             context.append({"role": "model", "parts": [{"text": "Understood."}]})
             
-        recent = self.turns[-(limit * 2):] if self.turns else []
-        for turn in recent:
+        # Read the (validated) turns property once; slicing an empty list is safe
+        for turn in self.turns[-(limit * 2):]:
             context.append({"role": "user", "parts": [{"text": turn['intent']}]})
             if 'response' in turn:
                 context.append({"role": "model", "parts": [{"text": turn['response']}]})
-        return context
+        self._context_cache = ((self._version, limit), context)
+        return list(context)
  
     def update_summary(self, new_summary: str, pruned_history: List[Any]):
         """Overwrite the old summary and update the remaining history."""
         self.data["summary"] = new_summary
         self.data["history"] = pruned_history
+        self._version += 1
         self._save()
 
     def set_kv(self, key: str, value: Any):
@@ -120,5 +133,6 @@ class JSONMemory(Memory):
 
     def clear(self):
         self.data = {"turns": [], "summary": "", "action_history": []}
+        self._version += 1
         if os.path.exists(self.path):
             os.remove(self.path)
@@ -1,7 +1,11 @@
 # src/sab_core/protocols/controller.py
+import time
 from abc import ABC, abstractmethod
 from typing import Any, Dict, Optional
 
+# 同一条消息在该窗口内重复提交（双击发送、回车+点击）视为一次
+SUBMIT_DEBOUNCE_NS = 1_000_000_000
+
 class BaseController(ABC):
     """
     SAB 逻辑控制器基类
@@ -10,6 +14,8 @@ class BaseController(ABC):
     def __init__(self, engine: Any, components: Dict[str, Any]):
         self.engine = engine
         self.components = components
+        # 最近一次提交：(文本哈希, 过期时间 ns)，单槽即可，无需按键维护字典
+        self._last_submit = (0, 0)
 
     @abstractmethod
     async def handle_send(self, text: Optional[str] = None):
@@ -21,6 +27,15 @@ class BaseController(ABC):
         """处理上下文（环境/档案/Profile）切换的标准流程"""
         pass
 
+    def _is_duplicate_submit(self, text: str) -> bool:
+        """窗口期内的同一文本返回 True；否则记录本次提交并返回 False"""
+        h, now = hash(text), time.monotonic_ns()
+        prev_h, expire = self._last_submit
+        if prev_h == h and now < expire:
+            return True
+        self._last_submit = (h, now + SUBMIT_DEBOUNCE_NS)
+        return False
+
     def update_ui_component(self, key: str, value: Any, method: str = None):
         """
         增强版：如果指定了 method 则调用方法，否则直接尝试修改属性（如 .value）
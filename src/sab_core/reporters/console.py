@@ -8,10 +8,10 @@ class ConsoleReporter(BaseReporter):
     def emit(self, observation: Observation, action: Action) -> None:
         logger.info("--- [SAB Step Report] ---")
         logger.info("Perceived from: {}", observation.source)
-        # 截断太长的 raw 输出
-        raw_snippet = observation.raw[:100] + "..." if len(observation.raw) > 100 else observation.raw
-        logger.info("Raw: {}", raw_snippet)
-        logger.info("Decision: {} {}", action.name, action.payload)
+        # 截断太长的 raw 输出；lazy：日志级别被过滤时不做切片和 payload 格式化
+        lazy = logger.opt(lazy=True)
+        lazy.info("Raw: {}", lambda: observation.raw[:100] + "..." if len(observation.raw) > 100 else observation.raw)
+        lazy.info("Decision: {} {}", lambda: action.name, lambda: action.payload)
         logger.info("--------------------------")
 
     def debug(self, message: str, level: str = "INFO"):
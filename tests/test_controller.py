@@ -0,0 +1,39 @@
+"""Tests for BaseController submit debouncing."""
+
+from sab_core.protocols import controller as controller_module
+from sab_core.protocols.controller import BaseController, SUBMIT_DEBOUNCE_NS
+
+
+class StubController(BaseController):
+    async def handle_send(self, text=None):
+        pass
+
+    async def switch_context(self, context_id):
+        pass
+
+
+def _clock(monkeypatch, now: int) -> None:
+    monkeypatch.setattr(controller_module.time, "monotonic_ns", lambda: now)
+
+
+def test_duplicate_within_window(monkeypatch) -> None:
+    ctrl = StubController(engine=None, components={})
+    _clock(monkeypatch, 10)
+    assert ctrl._is_duplicate_submit("hello") is False
+    _clock(monkeypatch, 10 + SUBMIT_DEBOUNCE_NS - 1)
+    assert ctrl._is_duplicate_submit("hello") is True
+
+
+def test_different_text_not_duplicate(monkeypatch) -> None:
+    ctrl = StubController(engine=None, components={})
+    _clock(monkeypatch, 10)
+    assert ctrl._is_duplicate_submit("hello") is False
+    assert ctrl._is_duplicate_submit("world") is False
+
+
+def test_same_text_after_window(monkeypatch) -> None:
+    ctrl = StubController(engine=None, components={})
+    _clock(monkeypatch, 10)
+    assert ctrl._is_duplicate_submit("hello") is False
+    _clock(monkeypatch, 10 + SUBMIT_DEBOUNCE_NS)
+    assert ctrl._is_duplicate_submit("hello") is False
@@ -0,0 +1,57 @@
+"""Tests for JSONMemory context memoisation."""
+
+from sab_core.memory.json_memory import JSONMemory
+
+
+def _memory(tmp_path) -> JSONMemory:
+    memory = JSONMemory(str(tmp_path), namespace="test")
+    memory.store({"intent": "hello", "response": "hi"})
+    return memory
+
+
+def test_get_context_returns_copy(tmp_path) -> None:
+    memory = _memory(tmp_path)
+    context = memory.get_context()
+    context.append({"role": "user", "parts": [{"text": "prompt"}]})
+    assert len(memory.get_context()) == 2
+
+
+def test_get_context_invalidated_by_store(tmp_path) -> None:
+    memory = _memory(tmp_path)
+    assert len(memory.get_context()) == 2
+    memory.store({"intent": "again"})
+    context = memory.get_context()
+    assert len(context) == 3
+    assert context[-1]["parts"][0]["text"] == "again"
+
+
+def test_get_context_invalidated_by_update_summary(tmp_path) -> None:
+    memory = _memory(tmp_path)
+    memory.get_context()
+    memory.update_summary("earlier chat", [])
+    context = memory.get_context()
+    assert context[0]["parts"][0]["text"] == "SYSTEM RECAP: earlier chat"
+
+
+def test_get_context_invalidated_by_clear(tmp_path) -> None:
+    memory = _memory(tmp_path)
+    memory.get_context()
+    memory.clear()
+    assert memory.get_context() == []
+
+
+def test_get_context_keyed_by_limit(tmp_path) -> None:
+    memory = _memory(tmp_path)
+    memory.store({"intent": "second", "response": "ok"})
+    memory.store({"intent": "third", "response": "ok"})
+    assert len(memory.get_context(limit=1)) == 4
+    assert len(memory.get_context(limit=10)) == 6
+
+
+def test_get_context_reused_across_store_action(tmp_path) -> None:
+    memory = _memory(tmp_path)
+    first = memory.get_context()
+    cached = memory._context_cache
+    memory.store_action({"command": "ls", "success": True})
+    assert memory.get_context() == first
+    assert memory._context_cache is cached
@@ -0,0 +1,30 @@
+"""Tests for ResponseParser JSON parsing."""
+
+from sab_core.brain.parser import ResponseParser
+
+
+def test_bare_json_fast_path() -> None:
+    text = '{"action": "run", "payload": {"pk": 1}, "suggestions": ["next"]}'
+    act = ResponseParser.parse_response(None, text)
+    assert act.name == "run"
+    assert act.payload == {"pk": 1}
+    assert act.suggestions == ["next"]
+
+
+def test_fenced_json_repair_path() -> None:
+    text = '```json\n{"action": "say", "payload": {"content": "hi"}}\n```'
+    act = ResponseParser.parse_response(None, text)
+    assert act.name == "say"
+    assert act.payload == {"content": "hi"}
+
+
+def test_say_without_content_uses_whole_json() -> None:
+    act = ResponseParser.parse_response(None, '{"action": "say"}')
+    assert act.payload == {"content": "{'action': 'say'}"}
+
+
+def test_plain_text_fallback() -> None:
+    act = ResponseParser.parse_response(None, 'Done. [SUGGESTIONS]: "a", *b*')
+    assert act.name == "say"
+    assert act.payload == {"content": "Done."}
+    assert act.suggestions == ["a", "b"]